@@ -0,0 +1,146 @@
+import asyncio
+import concurrent.futures
+import threading
+from collections import namedtuple
+from chunkindex import chunk_digest
+
+ChunkRecord = namedtuple('ChunkRecord', ['offset', 'length', 'digest', 'data'])
+
+# records handed to the event loop at once, amortizes the thread hop
+BATCH_SIZE = 64
+
+
+async def read_buffers_async(source, buffer_size=1 << 20):
+    """Yield byte buffers of about buffer_size from an asyncio.StreamReader or an async iterable of bytes.
+
+    An async iterator source (e.g. an async generator) is closed when this
+    generator finishes or is closed.
+    """
+    pending = bytearray()
+    if hasattr(source, 'read'):
+        while True:
+            data = await source.read(buffer_size - len(pending))
+            if not data:
+                break
+            pending += data
+            if len(pending) >= buffer_size:
+                yield bytes(pending)
+                pending.clear()
+    else:
+        iterator = source.__aiter__()
+        try:
+            async for data in iterator:
+                pending += data
+                if len(pending) >= buffer_size:
+                    yield bytes(pending)
+                    pending.clear()
+        finally:
+            if hasattr(iterator, 'aclose'):
+                await iterator.aclose()
+    if pending:
+        yield bytes(pending)
+
+
+async def chunk_async(chunker, source, buffer_size=1 << 20, queue_size=8, digest='blake2b', executor=None):
+    """Asynchronously yield ChunkRecords for a stream, chunked with chunker.chunk_stream.
+
+    source: asyncio.StreamReader or async iterable of bytes. Boundary
+    detection and digesting run on an executor thread, which pulls buffers
+    from the event loop only when it needs more input and blocks while
+    queue_size batches of records are waiting to be consumed, so a slow
+    consumer slows down reading instead of growing memory. Each stream
+    holds one executor thread while it is being chunked; pass an executor
+    with enough workers for the number of concurrent streams. Close the
+    generator (e.g. contextlib.aclosing) when stopping early so the worker
+    is released.
+    """
+    loop = asyncio.get_running_loop()
+    records = asyncio.Queue(maxsize=queue_size)
+    buffers = read_buffers_async(source, buffer_size)
+    stop = threading.Event()
+    waiting = [None]
+    # loop-side tasks started by the worker, awaited before buffers is closed
+    tasks = set()
+
+    async def tracked(coroutine):
+        task = asyncio.current_task()
+        tasks.add(task)
+        try:
+            return await coroutine
+        finally:
+            tasks.discard(task)
+
+    def wait_for(coroutine):
+        # run on the loop and block this worker thread until it is done
+        future = asyncio.run_coroutine_threadsafe(tracked(coroutine), loop)
+        waiting[0] = future
+        try:
+            return future.result()
+        finally:
+            waiting[0] = None
+
+    def work():
+        batch = []
+
+        def next_buffers():
+            while not stop.is_set():
+                # hand over what is done before waiting for more input
+                if batch:
+                    wait_for(records.put(list(batch)))
+                    batch.clear()
+                try:
+                    yield wait_for(buffers.__anext__())
+                except StopAsyncIteration:
+                    return
+
+        try:
+            offset = 0
+            for chunk in chunker.chunk_stream(next_buffers(), buffer_size=buffer_size):
+                if stop.is_set():
+                    return
+                batch.append(ChunkRecord(offset, len(chunk), chunk_digest(chunk, digest), chunk))
+                offset += len(chunk)
+                if len(batch) >= BATCH_SIZE:
+                    wait_for(records.put(list(batch)))
+                    batch.clear()
+            if batch:
+                wait_for(records.put(batch))
+            wait_for(records.put(None))
+        except concurrent.futures.CancelledError:
+            pass
+        except Exception as e:
+            if not stop.is_set():
+                try:
+                    wait_for(records.put(e))
+                except concurrent.futures.CancelledError:
+                    # the consumer left while the error was handed over
+                    pass
+
+    worker = loop.run_in_executor(executor, work)
+    try:
+        while True:
+            batch = await records.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            for record in batch:
+                yield record
+        await worker
+    finally:
+        if not worker.done():
+            # consumer left early: unblock the worker wherever it waits and let it finish
+            stop.set()
+            while not worker.done():
+                if waiting[0] is not None:
+                    waiting[0].cancel()
+                while not records.empty():
+                    records.get_nowait()
+                await asyncio.wait({worker}, timeout=0.01)
+        if not worker.cancelled():
+            # retrieve it, a failure has already been raised to the consumer
+            worker.exception()
+        # cancelled reads have to unwind before the input can be closed
+        if tasks:
+            await asyncio.wait(set(tasks))
+        await buffers.aclose()
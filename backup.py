@@ -0,0 +1,291 @@
+"""Deduplicating backup and restore on top of fastCDC.
+
+A repository holds chunk data in large packfiles written sequentially, an
+append-only index mapping each chunk digest to its place in a pack, and
+one directory per snapshot with a recipe (chunk manifest) per file. Only
+chunks the index has not seen yet are written, so repeated backups of
+slowly changing trees cost little more than the changed chunks.
+
+    python3 backup.py backup /srv/repo ~/documents
+    python3 backup.py list /srv/repo
+    python3 backup.py restore /srv/repo 20250101T120000 /tmp/documents
+"""
+import argparse
+import itertools
+import json
+import os
+import stat
+import time
+from chunkindex import ChunkIndex, chunk_digest
+from chunkmanifest import Manifest, ManifestWriter
+from fastCDC import fastCDC
+
+DIGEST_SIZE = 32
+
+
+class PackIndex(ChunkIndex):
+    '''
+    ChunkIndex that also records where each chunk is stored, as a
+    (pack, offset) payload after the record's length.
+    '''
+    magic = b'CDCPIDX2'
+    payload_dtype = [('pack', '<u4'), ('offset', '<u8')]
+    payload_format = 'IQ'
+
+    def _entry(self, length, pack, offset):
+        return pack, offset, length
+
+    def get(self, digest):
+        """(pack, offset, length) of a stored chunk, or None."""
+        return self.digests.get(digest)
+
+    def add_locations(self, entries):
+        """Record a batch of (digest, pack, offset, length) and flush it to the file."""
+        self.add_digests([digest for digest, _, _, _ in entries], [length for _, _, _, length in entries],
+                         [(pack, offset) for _, pack, offset, _ in entries])
+        self.file.flush()
+
+
+class Repository:
+    '''
+    Backup repository in a directory. The chunker parameters are fixed when
+    the repository is created and read back from config.json afterwards,
+    since chunks only deduplicate against chunks cut the same way.
+    '''
+
+    def __init__(self, path, min_size=16384, avg_size=65536, max_size=262144, norm_level=2, seed=0,
+                 pack_size=64 << 20):
+        self.path = path
+        config_path = os.path.join(path, 'config.json')
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                self.config = json.load(f)
+        else:
+            os.makedirs(os.path.join(path, 'packs'), exist_ok=True)
+            os.makedirs(os.path.join(path, 'snapshots'), exist_ok=True)
+            self.config = {'chunker': {'min_size': min_size, 'avg_size': avg_size, 'max_size': max_size,
+                                       'norm_level': norm_level, 'seed': seed},
+                           'pack_size': pack_size, 'digest': 'blake2b', 'digest_size': DIGEST_SIZE}
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump(self.config, f, indent=2)
+
+        self.chunker = fastCDC(mode='2020', **self.config['chunker'])
+        self.index = PackIndex(os.path.join(path, 'index'), self.config['digest'], self.config['digest_size'])
+        self.pack = None
+        self.pack_id = None
+        self.readers = {}
+
+    def pack_path(self, pack_id):
+        return os.path.join(self.path, 'packs', f"{pack_id:08d}.pack")
+
+    def _open_pack(self):
+        # continue the newest pack while it has room, packs are only ever appended to
+        packs = sorted(int(name.split('.')[0]) for name in os.listdir(os.path.join(self.path, 'packs'))
+                       if name.endswith('.pack'))
+        pack_id = packs[-1] if packs else 0
+        if packs and os.path.getsize(self.pack_path(pack_id)) >= self.config['pack_size']:
+            pack_id += 1
+        self.pack_id = pack_id
+        self.pack = open(self.pack_path(pack_id), 'ab', buffering=1 << 20)
+
+    def store(self, chunks):
+        """Append the chunks the index does not know yet to the current pack.
+
+        chunks is a list of (digest, data). The pack is flushed before the
+        index records are written, so the index never points past the data.
+        """
+        entries = []
+        seen = set()
+        stored = 0
+        for digest, data in chunks:
+            if digest in self.index or digest in seen:
+                continue
+            seen.add(digest)
+            if self.pack is None:
+                self._open_pack()
+            elif self.pack.tell() >= self.config['pack_size']:
+                self.pack.flush()
+                self.pack.close()
+                self.index.add_locations(entries)
+                entries = []
+                self._open_pack()
+            entries.append((digest, self.pack_id, self.pack.tell(), len(data)))
+            self.pack.write(data)
+            stored += len(data)
+        if entries:
+            self.pack.flush()
+            self.index.add_locations(entries)
+        return stored
+
+    def backup_file(self, path, recipe_path, batch_size=256):
+        """Chunk one file into the packs and write its recipe; returns the bytes newly stored."""
+        stored = 0
+        batch = []
+        with open(path, 'rb') as f, ManifestWriter.for_chunker(recipe_path, self.chunker) as recipe:
+            for chunk in self.chunker.chunk_stream(f):
+                digest = chunk_digest(chunk, self.config['digest'], self.config['digest_size'])
+                recipe.add(chunk, digest)
+                batch.append((digest, chunk))
+                if len(batch) >= batch_size:
+                    stored += self.store(batch)
+                    batch = []
+            stored += self.store(batch)
+        return stored
+
+    def backup(self, source, name=None):
+        """Back up the tree under source as a new snapshot, returns its summary."""
+        if not os.path.isdir(source):
+            raise ValueError(f"{source} is not a directory")
+        if name is not None:
+            snapshot_dir = os.path.join(self.path, 'snapshots', name)
+            try:
+                os.makedirs(snapshot_dir)
+            except FileExistsError:
+                raise ValueError(f"Snapshot {name} already exists") from None
+        else:
+            # timestamps only have one-second resolution, later backups in the same second get a suffix
+            stamp = time.strftime('%Y%m%dT%H%M%S')
+            for attempt in itertools.count():
+                name = f"{stamp}-{attempt}" if attempt else stamp
+                snapshot_dir = os.path.join(self.path, 'snapshots', name)
+                try:
+                    os.makedirs(snapshot_dir)
+                    break
+                except FileExistsError:
+                    continue
+        entries = []
+        summary = {'name': name, 'source': os.path.abspath(source), 'files': 0, 'total_size': 0, 'stored_size': 0}
+
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            rel_root = os.path.relpath(root, source)
+            if rel_root != '.':
+                entries.append({'path': rel_root, 'type': 'dir', 'mode': stat.S_IMODE(os.lstat(root).st_mode)})
+            # os.walk lists symlinks to directories with the directories but does not follow them
+            for dirname in [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+                dirs.remove(dirname)
+                entries.append({'path': os.path.normpath(os.path.join(rel_root, dirname)), 'type': 'link',
+                                'target': os.readlink(os.path.join(root, dirname))})
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                rel = os.path.normpath(os.path.join(rel_root, filename))
+                info = os.lstat(path)
+                if stat.S_ISLNK(info.st_mode):
+                    entries.append({'path': rel, 'type': 'link', 'target': os.readlink(path)})
+                elif stat.S_ISREG(info.st_mode):
+                    recipe = f"{summary['files']:08d}.manifest"
+                    summary['stored_size'] += self.backup_file(path, os.path.join(snapshot_dir, recipe))
+                    summary['files'] += 1
+                    summary['total_size'] += info.st_size
+                    entries.append({'path': rel, 'type': 'file', 'mode': stat.S_IMODE(info.st_mode),
+                                    'mtime': info.st_mtime, 'size': info.st_size, 'recipe': recipe})
+
+        # nothing new stored means every chunk was already in the repository,
+        # the rate is then unbounded and recorded as null
+        if summary['stored_size']:
+            summary['dedup_rate'] = summary['total_size'] / summary['stored_size']
+        else:
+            summary['dedup_rate'] = None if summary['total_size'] else 1.0
+        with open(os.path.join(snapshot_dir, 'snapshot.json'), 'w', encoding='utf-8') as f:
+            json.dump({**summary, 'entries': entries}, f, indent=1)
+        return summary
+
+    def snapshots(self):
+        """Names of the complete snapshots, oldest first."""
+        root = os.path.join(self.path, 'snapshots')
+        return sorted(name for name in os.listdir(root) if os.path.exists(os.path.join(root, name, 'snapshot.json')))
+
+    def read_chunk(self, digest):
+        location = self.index.get(digest)
+        if location is None:
+            raise ValueError(f"Chunk {digest.hex()} is missing from the repository")
+        pack_id, offset, length = location
+        if pack_id == self.pack_id and self.pack is not None:
+            self.pack.flush()
+        if pack_id not in self.readers:
+            self.readers[pack_id] = open(self.pack_path(pack_id), 'rb')
+        return os.pread(self.readers[pack_id].fileno(), length, offset)
+
+    def restore_file(self, recipe_path, target, verify=True):
+        manifest = Manifest(recipe_path)
+        with open(target, 'wb') as out:
+            for i in range(len(manifest)):
+                digest = manifest.digest_at(i)
+                data = self.read_chunk(digest)
+                if verify and chunk_digest(data, self.config['digest'], self.config['digest_size']) != digest:
+                    raise ValueError(f"Chunk {digest.hex()} is corrupted in pack storage")
+                out.write(data)
+
+    def restore(self, name, target, verify=True):
+        """Recreate snapshot name under target, streaming file contents back from the packs."""
+        snapshot_dir = os.path.join(self.path, 'snapshots', name)
+        with open(os.path.join(snapshot_dir, 'snapshot.json'), 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        os.makedirs(target, exist_ok=True)
+
+        for entry in snapshot['entries']:
+            path = os.path.join(target, entry['path'])
+            if entry['type'] == 'dir':
+                os.makedirs(path, exist_ok=True)
+            elif entry['type'] == 'link':
+                os.symlink(entry['target'], path)
+            else:
+                self.restore_file(os.path.join(snapshot_dir, entry['recipe']), path, verify)
+                os.chmod(path, entry['mode'])
+                os.utime(path, (entry['mtime'], entry['mtime']))
+        # directory modes last, a read-only directory would block its own restore
+        for entry in reversed(snapshot['entries']):
+            if entry['type'] == 'dir':
+                os.chmod(os.path.join(target, entry['path']), entry['mode'])
+        return snapshot
+
+    def close(self):
+        if self.pack is not None:
+            self.pack.close()
+        for reader in self.readers.values():
+            reader.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplicating backups with fastCDC")
+    commands = parser.add_subparsers(dest='command', required=True)
+    backup_parser = commands.add_parser('backup', help="back up a directory")
+    backup_parser.add_argument('repository')
+    backup_parser.add_argument('source')
+    backup_parser.add_argument('--name', help="snapshot name (default: current time)")
+    restore_parser = commands.add_parser('restore', help="restore a snapshot")
+    restore_parser.add_argument('repository')
+    restore_parser.add_argument('name')
+    restore_parser.add_argument('target')
+    list_parser = commands.add_parser('list', help="list snapshots")
+    list_parser.add_argument('repository')
+    args = parser.parse_args(argv)
+
+    with Repository(args.repository) as repository:
+        if args.command == 'backup':
+            try:
+                summary = repository.backup(args.source, args.name)
+            except ValueError as e:
+                parser.exit(1, f"{parser.prog}: error: {e}\n")
+            if summary['dedup_rate'] is not None:
+                stored = f"{summary['stored_size']:,} new bytes stored ({summary['dedup_rate']:.2f}x)"
+            else:
+                stored = "all chunks already stored"
+            print(f"{summary['name']}: {summary['files']} files, {summary['total_size']:,} bytes, {stored}")
+        elif args.command == 'restore':
+            snapshot = repository.restore(args.name, args.target)
+            print(f"Restored {snapshot['files']} files to {args.target}")
+        else:
+            for name in repository.snapshots():
+                print(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Chunking many files or buffers at once on a pool of worker processes.
+
+Inputs are scheduled largest first, and small ones are grouped into larger
+tasks, so neither a few huge files nor per-task overhead dominate the run.
+
+    from batchchunking import chunk_batch
+    from fastCDC import fastCDC
+
+    chunk_sets = chunk_batch(fastCDC(mode='2020'), paths)
+"""
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from chunkio import as_buffer
+from chunkset import ChunkSet
+
+# chunker of this worker process, set up once by _init_worker
+_chunker = None
+
+
+def _init_worker(chunker):
+    global _chunker
+    _chunker = chunker
+
+
+def item_size(item):
+    return os.path.getsize(item) if isinstance(item, (str, os.PathLike)) else len(as_buffer(item))
+
+
+def _chunk_set(chunker, item):
+    """ChunkSet of a path (read through mmap) or a bytes-like object, without its source."""
+    if not isinstance(item, (str, os.PathLike)):
+        data = as_buffer(item)
+        chunks = ChunkSet.from_boundaries(data, chunker.find_boundaries(data))
+        chunks.source = None
+        return chunks
+    with open(item, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ChunkSet.from_boundaries(b'', [])
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                chunks = ChunkSet.from_boundaries(view, chunker.find_boundaries(view))
+                chunks.source = None
+            finally:
+                view.release()
+    return chunks
+
+
+def _chunk_group(group, output_dir):
+    """Worker task: chunk (index, item) pairs, return (index, ChunkSet or manifest path) pairs."""
+    results = []
+    for index, item in group:
+        chunks = _chunk_set(_chunker, item)
+        if output_dir is not None:
+            path = os.path.join(output_dir, f"{index:08d}.manifest")
+            chunks.save(path, _chunker)
+            chunks = path
+        results.append((index, chunks))
+    return results
+
+
+class BatchChunker:
+    '''
+    Chunks many files or buffers on a pool of long-lived worker processes.
+    The chunker is sent to each worker once when it starts, so gear tables
+    and Rabin tables are built a single time per batch run, not per file.
+    '''
+
+    def __init__(self, chunker, workers=None, group_size=4 << 20, output_dir=None):
+        '''
+        group_size: small inputs are sent to workers in groups of about this
+        many bytes, to keep per-task overhead down
+        output_dir: if set, each input's chunks are written there as a
+        chunk manifest (<input index>.manifest) and the path is returned
+        instead of the ChunkSet
+        '''
+        self.chunker = chunker
+        self.workers = workers or os.cpu_count() or 1
+        self.group_size = group_size
+        self.output_dir = output_dir
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(chunker,))
+
+    def schedule(self, items):
+        """Groups of (index, item), largest inputs first so big files do not finish last."""
+        sizes = [item_size(item) for item in items]
+        groups = []
+        group = []
+        group_bytes = 0
+        for index in sorted(range(len(items)), key=lambda i: sizes[i], reverse=True):
+            group.append((index, items[index]))
+            group_bytes += sizes[index]
+            if group_bytes >= self.group_size:
+                groups.append(group)
+                group = []
+                group_bytes = 0
+        if group:
+            groups.append(group)
+        return groups
+
+    def map(self, items):
+        """ChunkSet (or manifest path) of every item, in input order.
+
+        items are paths or bytes-like objects; paths are read by the
+        workers through mmap, buffers are copied to them.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        futures = [self.pool.submit(_chunk_group, group, self.output_dir) for group in self.schedule(items)]
+        for future in futures:
+            for index, chunks in future.result():
+                results[index] = chunks
+        return results
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def chunk_batch(chunker, items, workers=None, output_dir=None):
+    """One-off BatchChunker(chunker, workers, output_dir=output_dir).map(items)."""
+    with BatchChunker(chunker, workers, output_dir=output_dir) as batch:
+        return batch.map(items)
@@ -0,0 +1,219 @@
+"""Throughput benchmark for RabinChunker, GearChunker and fastCDC.
+
+Every (algorithm, parameters, corpus) case runs in its own forked process
+so its peak RSS can be reported, and results are written as JSON so runs
+from different commits can be compared.
+
+    python3 benchmark.py --size 8 --output bench.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import time
+import numpy as np
+from chunkstats import ChunkStats
+from fastCDC import fastCDC
+from gearhashing import GearChunker
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# (min_size, avg_size, max_size)
+SIZE_GRID = [
+    (512, 2048, 8192),
+    (2048, 8192, 16384),
+    (4096, 16384, 65536),
+]
+NORM_LEVELS = [1, 2, 3]
+
+
+def make_corpora(size, seed=0):
+    """Deterministic benchmark inputs of roughly size bytes each."""
+    rng = np.random.default_rng(seed)
+    corpora = {}
+
+    with open(DATA_FILE, 'rb') as f:
+        corpora['data'] = f.read()
+
+    corpora['random'] = rng.bytes(size)
+
+    # few symbols with skewed frequencies, compresses well but is not periodic
+    symbols = np.frombuffer(b' etaoinshrdlu\n', dtype=np.uint8)
+    weights = np.linspace(2.0, 0.2, len(symbols))
+    corpora['lowentropy'] = rng.choice(symbols, size=size, p=weights / weights.sum()).tobytes()
+
+    # a base file followed by versions of it with small inserts, deletes and overwrites
+    versions = 4
+    version = bytearray(rng.bytes(size // versions))
+    edited = []
+    for _ in range(versions):
+        edited.append(bytes(version))
+        for _ in range(8):
+            pos = int(rng.integers(0, len(version)))
+            kind = rng.integers(0, 3)
+            if kind == 0:
+                version[pos:pos] = rng.bytes(int(rng.integers(1, 256)))
+            elif kind == 1:
+                del version[pos:pos + int(rng.integers(1, 256))]
+            else:
+                patch = rng.bytes(int(rng.integers(1, 256)))
+                version[pos:pos + len(patch)] = patch
+    corpora['versioned'] = b''.join(edited)
+
+    # random data broken up by long runs of zero bytes, like sparse disk images
+    parts = []
+    total = 0
+    while total < size:
+        part = rng.bytes(int(rng.integers(1 << 12, 1 << 16))) if len(parts) % 2 == 0 \
+            else bytes(int(rng.integers(1 << 12, 1 << 18)))
+        parts.append(part)
+        total += len(part)
+    corpora['zeros'] = b''.join(parts)[:size]
+
+    return corpora
+
+
+def make_cases(algorithms):
+    cases = []
+    for min_size, avg_size, max_size in SIZE_GRID:
+        params = {'min_size': min_size, 'avg_size': avg_size, 'max_size': max_size}
+        if 'rabin' in algorithms:
+            cases.append(('rabin', dict(params)))
+        if 'gear' in algorithms:
+            cases.append(('gear', dict(params)))
+        for algorithm in ('fastcdc', 'fastcdc2020'):
+            if algorithm in algorithms:
+                for norm_level in NORM_LEVELS:
+                    cases.append((algorithm, dict(params, norm_level=norm_level)))
+    return cases
+
+
+def make_chunker(algorithm, params):
+    if algorithm == 'rabin':
+        # galois is only needed for Rabin, so import it lazily
+        from rabinfingerprint import RabinChunker
+        return RabinChunker(**params)
+    if algorithm == 'gear':
+        return GearChunker(**params)
+    if algorithm == 'fastcdc2020':
+        return fastCDC(mode='2020', **params)
+    return fastCDC(**params)
+
+
+def run_case(algorithm, params, data, repeat):
+    """Time boundary detection for one case, best of repeat runs."""
+    rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    t0 = time.perf_counter()
+    chunker = make_chunker(algorithm, params)
+    setup = time.perf_counter() - t0
+
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        boundaries = chunker.find_boundaries(data)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    view = memoryview(data)
+    stats = ChunkStats(chunker.min_size, chunker.avg_size, chunker.max_size)
+    start = 0
+    for end in boundaries:
+        stats.update(view[start:end])
+        start = end
+    result = stats.result()
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1 if platform.system() == 'Darwin' else 1024
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'seconds': best,
+        'setup_seconds': setup,
+        'mb_per_s': len(data) / best / 1e6 if best else 0.0,
+        'chunks_per_s': len(boundaries) / best if best else 0.0,
+        'num_chunks': len(boundaries),
+        'avg_chunk': result['avg_chunk'],
+        'dedup_rate': result['dedup_rate'],
+        'peak_rss_mb': rss_peak * scale / 1e6,
+        'peak_rss_delta_mb': (rss_peak - rss_start) * scale / 1e6,
+    }
+
+
+def _run_case_child(queue, algorithm, params, data, repeat):
+    try:
+        queue.put(run_case(algorithm, params, data, repeat))
+    except Exception as e:
+        queue.put({'error': repr(e)})
+
+
+def run_isolated(algorithm, params, data, repeat):
+    """run_case in a forked child so peak RSS is per case; inline where fork is missing."""
+    if 'fork' not in mp.get_all_start_methods():
+        return run_case(algorithm, params, data, repeat)
+    ctx = mp.get_context('fork')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_case_child, args=(queue, algorithm, params, data, repeat))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(DATA_FILE),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CDC chunkers")
+    parser.add_argument('--size', type=float, default=4, help="synthetic corpus size in MiB")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per case, best is kept")
+    parser.add_argument('--algorithms', default='rabin,gear,fastcdc,fastcdc2020', help="comma separated list")
+    parser.add_argument('--corpora', default='data,random,lowentropy,versioned,zeros', help="comma separated list")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the synthetic corpora")
+    parser.add_argument('--output', default='benchmark.json', help="JSON results file")
+    args = parser.parse_args(argv)
+
+    algorithms = args.algorithms.split(',')
+    corpora = make_corpora(int(args.size * (1 << 20)), args.seed)
+    names = args.corpora.split(',')
+
+    results = []
+    for algorithm, params in make_cases(algorithms):
+        for name in names:
+            data = corpora[name]
+            result = run_isolated(algorithm, params, data, args.repeat)
+            result.update({'algorithm': algorithm, 'corpus': name, 'corpus_size': len(data), **params})
+            results.append(result)
+            if 'error' in result:
+                print(f"{algorithm:11s} {name:11s} {params} failed: {result['error']}")
+            else:
+                print(f"{algorithm:11s} {name:11s} {params} {result['mb_per_s']:8.2f} MB/s "
+                      f"{result['chunks_per_s']:10.0f} chunks/s  dedup {result['dedup_rate']:.2f}x  "
+                      f"rss {result['peak_rss_mb']:.0f} MB")
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'size_mib': args.size,
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Headless chunking of files or stdin, one JSON object per line.
+
+For every chunk a {"file", "index", "offset", "length", "digest"} line is
+printed, followed by a {"file", "stats"} line per input. Inputs are
+streamed, so memory stays bounded whatever their size, and galois is only
+imported for Rabin.
+
+    python3 cdc.py --algorithm fastcdc --avg 8192 backup.img > chunks.jsonl
+    tar c dir | python3 cdc.py --no-chunks -
+"""
+import argparse
+import json
+import sys
+from chunkindex import chunk_digest
+from chunkmanifest import ManifestWriter
+from chunkstats import ChunkStats
+from gearhashing import DEFAULT_SEED
+
+ALGORITHMS = ('rabin', 'gear', 'fastcdc', 'fastcdc2020')
+
+
+def make_chunker(args):
+    params = {'min_size': args.min, 'avg_size': args.avg, 'max_size': args.max}
+    if args.algorithm == 'rabin':
+        # galois is only needed for Rabin, so import it lazily
+        from rabinfingerprint import RabinChunker
+        return RabinChunker(window_mode=args.window_mode, seed=args.seed, **params)
+    if args.algorithm == 'gear':
+        from gearhashing import GearChunker
+        return GearChunker(seed=args.seed, **params)
+    from fastCDC import fastCDC
+    mode = '2020' if args.algorithm == 'fastcdc2020' else 'classic'
+    return fastCDC(norm_level=args.norm_level, seed=args.seed, mode=mode, **params)
+
+
+def chunk_input(chunker, name, source, args, out, manifest=None):
+    stats = ChunkStats(chunker.min_size, chunker.avg_size, chunker.max_size)
+    offset = 0
+    for index, chunk in enumerate(chunker.chunk_stream(source, buffer_size=args.buffer_size)):
+        digest = chunk_digest(chunk, args.digest)
+        stats.update(chunk, digest)
+        if manifest is not None:
+            manifest.add(chunk, digest)
+        if not args.no_chunks:
+            out.write(json.dumps({'file': name, 'index': index, 'offset': offset,
+                                  'length': len(chunk), 'digest': digest.hex()}) + '\n')
+        offset += len(chunk)
+    out.write(json.dumps({'file': name, 'algorithm': args.algorithm, 'stats': stats.result()}) + '\n')
+    out.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunk files or stdin and print JSON lines")
+    parser.add_argument('paths', nargs='*', default=['-'], help="files to chunk, - for stdin (default)")
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='fastcdc')
+    parser.add_argument('--min', type=int, default=2048, help="min chunk size in bytes")
+    parser.add_argument('--avg', type=int, default=8192, help="average chunk size in bytes")
+    parser.add_argument('--max', type=int, default=16384, help="max chunk size in bytes")
+    parser.add_argument('--norm-level', type=int, default=3, help="fastCDC normalization level")
+    parser.add_argument('--window-mode', choices=('sqrt', 'log'), default='sqrt', help="Rabin window size")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="gear table / Rabin polynomial seed")
+    parser.add_argument('--digest', default='blake2b', help="hashlib algorithm for chunk digests")
+    parser.add_argument('--buffer-size', type=int, default=1 << 20, help="bytes read at a time")
+    parser.add_argument('--no-chunks', action='store_true', help="only print the stats line per input")
+    parser.add_argument('--manifest', help="also write a binary chunk manifest (single input only)")
+    args = parser.parse_args(argv)
+
+    if not args.min < args.avg < args.max:
+        parser.error("must satisfy: min < avg < max")
+    if args.manifest and len(args.paths) != 1:
+        parser.error("--manifest takes exactly one input")
+
+    chunker = make_chunker(args)
+    out = sys.stdout
+    manifest = ManifestWriter.for_chunker(args.manifest, chunker, args.digest) if args.manifest else None
+    try:
+        for path in args.paths:
+            if path == '-':
+                chunk_input(chunker, '-', sys.stdin.buffer, args, out, manifest)
+            else:
+                with open(path, 'rb') as f:
+                    chunk_input(chunker, path, f, args, out, manifest)
+    except BrokenPipeError:
+        # reader went away (e.g. piped into head), stop quietly
+        sys.stdout = None
+        sys.exit(1)
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+
+if __name__ == "__main__":
+    main()
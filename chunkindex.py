@@ -0,0 +1,151 @@
+import hashlib
+import os
+import struct
+import numpy as np
+
+MAGIC = b'CDCIDX2\0'
+# magic, algorithm, digest size, all-time bytes and chunks added
+HEADER = struct.Struct('<8s16sI4xQQ')
+
+
+def chunk_digest(chunk, algorithm='blake2b', digest_size=32):
+    """Strong digest of a chunk, used as its content address."""
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(chunk, digest_size=digest_size).digest()
+    return hashlib.new(algorithm, chunk).digest()
+
+
+class ChunkIndex:
+    '''
+    Content-addressed chunk index kept in an append-only file of
+    (digest, length) records, with an in-memory hash table of digests in
+    front of it. Memory grows with the number of unique chunks, not with
+    the amount of data ingested. The all-time totals of added bytes and
+    chunks live in the header and are rewritten on flush and close, so
+    dedup_rate() covers everything the index has seen.
+
+    Subclasses can store a fixed-size payload after each record's length
+    (payload_dtype for loading, payload_format for appending); the
+    digests container is then a dict from digest to payload.
+    '''
+    magic = MAGIC
+    payload_dtype = []
+    payload_format = ''
+
+    def __init__(self, path, algorithm='blake2b', digest_size=32):
+        self.path = path
+        self.algorithm = algorithm
+        self.digest_size = digest_size if algorithm == 'blake2b' else hashlib.new(algorithm).digest_size
+        self.record_dtype = np.dtype([('digest', np.uint8, (self.digest_size,)), ('length', '<u4')] + self.payload_dtype)
+        self.record_tail = struct.Struct('<I' + self.payload_format)
+        self.digests = {} if self.payload_dtype else set()
+        self.unique_size = 0
+        self.total_size = 0
+        self.total_chunks = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._load()
+            self.file = open(path, 'r+b')
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(path, 'w+b')
+            self.file.write(self._header())
+            self.file.flush()
+
+    def _header(self):
+        return HEADER.pack(self.magic, self.algorithm.encode('ascii'), self.digest_size, self.total_size, self.total_chunks)
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            magic, algorithm, digest_size, self.total_size, self.total_chunks = HEADER.unpack(f.read(HEADER.size))
+            if magic != self.magic:
+                raise ValueError(f"{self.path} is not a chunk index")
+            algorithm = algorithm.rstrip(b'\0').decode('ascii')
+            if (algorithm, digest_size) != (self.algorithm, self.digest_size):
+                raise ValueError(f"{self.path} uses {algorithm}/{digest_size}, not {self.algorithm}/{self.digest_size}")
+            raw = f.read()
+
+        # a torn last record from an interrupted append is dropped so new
+        # records stay aligned
+        count = len(raw) // self.record_dtype.itemsize
+        if len(raw) % self.record_dtype.itemsize:
+            os.truncate(self.path, HEADER.size + count * self.record_dtype.itemsize)
+        records = np.frombuffer(raw, dtype=self.record_dtype, count=count)
+        flat = records['digest'].tobytes()
+        keys = [flat[i:i + self.digest_size] for i in range(0, len(flat), self.digest_size)]
+        if self.payload_dtype:
+            columns = [records['length'].tolist()] + [records[name].tolist() for name, _ in self.payload_dtype]
+            self.digests = {key: self._entry(*fields) for key, *fields in zip(keys, *columns)}
+        else:
+            self.digests = set(keys)
+        self.unique_size = int(records['length'].sum(dtype=np.uint64))
+
+    def _entry(self, length, *payload):
+        """Value kept in the digests dict for a record with a payload."""
+        return (length, *payload)
+
+    def digest(self, chunk):
+        return chunk_digest(chunk, self.algorithm, self.digest_size)
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __contains__(self, digest):
+        return digest in self.digests
+
+    def lookup(self, digests):
+        """Batched membership test, returns a bool array."""
+        known = self.digests
+        return np.fromiter((d in known for d in digests), dtype=bool, count=len(digests))
+
+    def add_digests(self, digests, lengths, payloads=None):
+        """Record a batch of chunks by digest, appending the new ones in a single write.
+
+        payloads gives each chunk's payload tuple when the index has one.
+        Returns a bool array telling which entries were new.
+        """
+        new = np.zeros(len(digests), dtype=bool)
+        records = bytearray()
+        for i, (digest, length) in enumerate(zip(digests, lengths)):
+            self.total_chunks += 1
+            self.total_size += length
+            if digest in self.digests:
+                continue
+            payload = payloads[i] if payloads is not None else ()
+            if self.payload_dtype:
+                self.digests[digest] = self._entry(length, *payload)
+            else:
+                self.digests.add(digest)
+            self.unique_size += length
+            records += digest + self.record_tail.pack(length, *payload)
+            new[i] = True
+        if records:
+            self.file.write(records)
+        return new
+
+    def add(self, chunks):
+        """Digest and record a batch of chunks, returns which ones were new."""
+        chunks = list(chunks)
+        return self.add_digests([self.digest(chunk) for chunk in chunks], [len(chunk) for chunk in chunks])
+
+    def dedup_rate(self):
+        return self.total_size / self.unique_size if self.unique_size > 0 else 1.0
+
+    def _write_totals(self):
+        self.file.flush()
+        os.pwrite(self.file.fileno(), self._header(), 0)
+
+    def flush(self):
+        self._write_totals()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self._write_totals()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
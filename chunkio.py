@@ -0,0 +1,159 @@
+import mmap
+import os
+import time
+import numpy as np
+from chunkset import ChunkSet
+
+
+def as_buffer(data):
+    """Zero-copy byte view of data; str is encoded as UTF-8."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    view = memoryview(data)
+    if view.ndim != 1 or view.format != 'B':
+        view = view.cast('B')
+    return view
+
+
+def split_chunks(data, boundaries, output='bytes'):
+    """Turn chunk end offsets into chunks.
+
+    output: bytes (copied chunks), views (memoryview slices of data),
+    offsets (int64 array of (offset, length) rows) or chunkset (ChunkSet
+    with digests, referencing data).
+    """
+    if output == 'offsets':
+        ends = np.asarray(boundaries, dtype=np.int64)
+        starts = np.zeros_like(ends)
+        starts[1:] = ends[:-1]
+        return np.column_stack((starts, ends - starts))
+    if output == 'chunkset':
+        return ChunkSet.from_boundaries(data, boundaries)
+    if output not in ('bytes', 'views'):
+        raise ValueError(f"Unknown output: {output}")
+
+    chunks = []
+    start = 0
+    for end in boundaries:
+        chunk = data[start:end]
+        chunks.append(bytes(chunk) if output == 'bytes' else chunk)
+        start = end
+    return chunks
+
+
+def read_buffers(readable, buffer_size=1 << 20):
+    """Yield byte buffers from a file object or an iterable of byte strings."""
+    if hasattr(readable, 'read'):
+        while True:
+            buffer = readable.read(buffer_size)
+            if not buffer:
+                break
+            yield buffer.encode('utf-8') if isinstance(buffer, str) else buffer
+    else:
+        for buffer in readable:
+            if buffer:
+                yield buffer.encode('utf-8') if isinstance(buffer, str) else buffer
+
+
+def stream_chunks(chunker, readable, buffer_size=1 << 20):
+    """Yield chunks from readable with a chunker's find_candidates/next_cut.
+
+    Only the partial chunk since the last cut plus the current buffer are
+    held, together with the candidate positions inside them, so memory stays
+    around max_size + buffer_size whatever the input size.
+    """
+    pending = bytearray()
+    history = b''
+    candidates = np.empty(0, dtype=np.int64)
+
+    for buffer in read_buffers(readable, buffer_size):
+        tail = bytes(history) + bytes(pending[max(0, len(pending) - chunker.window_size + 1):])
+        found = chunker.find_candidates(buffer, tail) + len(pending)
+        candidates = np.concatenate((candidates, found))
+        pending += buffer
+
+        start = 0
+        while True:
+            end = chunker.next_cut(pending, candidates, start)
+            if end is None:
+                break
+            yield bytes(pending[start:end])
+            start = end
+
+        if start:
+            history = (bytes(history) + bytes(pending[max(0, start - chunker.window_size + 1):start]))[-(chunker.window_size - 1):]
+            del pending[:start]
+            candidates = candidates[np.searchsorted(candidates, start):] - start
+
+    if pending:
+        yield bytes(pending)
+
+
+def block_candidates(chunker, hash_block, data, history=b''):
+    """Positions in data where the window hash matches chunker.mask (hash & mask == 0).
+
+    hash_block(block, history) gives the hash at every position of a block
+    of chunker.block_size bytes; each block gets the window_size - 1 bytes
+    before it as history, taken from history at the start of data.
+    """
+    mask = np.uint64(chunker.mask)
+    candidates = []
+    for offset in range(0, len(data), chunker.block_size):
+        lo = offset - chunker.window_size + 1
+        block_history = data[lo:offset] if lo >= 0 else bytes(history) + bytes(data[:offset])
+        hashes = hash_block(data[offset:offset + chunker.block_size], block_history)
+        candidates.append(np.flatnonzero((hashes & mask) == 0) + offset)
+    if not candidates:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(candidates)
+
+
+def walk_boundaries(chunker, data):
+    """Chunk end offsets of data with a chunker's find_candidates/next_cut (or loop_boundaries for engine='python').
+
+    With chunker.metrics set the run is recorded, with 'candidates' and
+    'cuts' phases for the numpy engine and a single 'loop' phase otherwise.
+    """
+    metrics = chunker.metrics
+    if metrics is not None:
+        started = time.perf_counter()
+    if chunker.engine == 'python':
+        boundaries = chunker.loop_boundaries(data)
+        if metrics is not None:
+            metrics.record(chunker, len(data), boundaries, {'loop': time.perf_counter() - started})
+        return boundaries
+
+    candidates = chunker.find_candidates(data)
+    if metrics is not None:
+        found = time.perf_counter()
+    boundaries = []
+    start = 0
+    while start < len(data):
+        end = chunker.next_cut(data, candidates, start)
+        if end is None:
+            end = len(data)
+        boundaries.append(end)
+        start = end
+    if metrics is not None:
+        metrics.record(chunker, len(data), boundaries,
+                       {'candidates': found - started, 'cuts': time.perf_counter() - found})
+    return boundaries
+
+
+def chunk_file(chunker, path):
+    """Chunk end offsets of a file, found straight over a read-only mmap.
+
+    The file is never read into a Python object; the OS page cache serves
+    the mapped pages to the boundary search.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return np.empty(0, dtype=np.uint64)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                return np.asarray(chunker.find_boundaries(view), dtype=np.uint64)
+            finally:
+                view.release()
@@ -0,0 +1,157 @@
+import json
+import os
+import struct
+import numpy as np
+from chunkindex import chunk_digest
+
+MAGIC = b'CDCMAN1\0'
+# magic, header size (fixed part + JSON + padding), digest size, chunk count, data size
+HEADER = struct.Struct('<8sIIQQ')
+
+
+def record_dtype(digest_size):
+    """One manifest row: uint64 offset, uint32 length and the chunk digest, packed."""
+    return np.dtype([('offset', '<u8'), ('length', '<u4'), ('digest', np.uint8, (digest_size,))])
+
+
+def describe_chunker(chunker):
+    """(algorithm, params) of a chunker: everything its boundaries depend on.
+
+    Chunkers describe themselves with a describe method; for other objects
+    only the size limits are recorded, under the class name.
+    """
+    if hasattr(chunker, 'describe'):
+        return chunker.describe()
+    return type(chunker).__name__, {'min_size': chunker.min_size, 'avg_size': chunker.avg_size,
+                                    'max_size': chunker.max_size}
+
+
+class ManifestWriter:
+    '''
+    Streaming writer of a chunk manifest: a header with the algorithm,
+    its parameters and the digest type, followed by fixed-size (offset,
+    length, digest) records. Rows are appended as chunks come in; the
+    chunk count in the header is filled in by flush and close.
+    '''
+
+    def __init__(self, path, algorithm, params, digest='blake2b', digest_size=32):
+        self.path = path
+        self.digest = digest
+        self.digest_size = digest_size if digest == 'blake2b' else len(chunk_digest(b'', digest))
+        self.dtype = record_dtype(self.digest_size)
+        self.count = 0
+        self.data_size = 0
+
+        meta = json.dumps({'algorithm': algorithm, 'params': params, 'digest': digest}).encode('utf-8')
+        self.header_size = -(-(HEADER.size + len(meta)) // 8) * 8
+        self.file = open(path, 'wb')
+        self.file.write(self._header() + meta + bytes(self.header_size - HEADER.size - len(meta)))
+
+    @classmethod
+    def for_chunker(cls, path, chunker, digest='blake2b', digest_size=32):
+        algorithm, params = describe_chunker(chunker)
+        return cls(path, algorithm, params, digest, digest_size)
+
+    def _header(self):
+        return HEADER.pack(MAGIC, self.header_size, self.digest_size, self.count, self.data_size)
+
+    def add(self, chunk, digest=None):
+        """Append one chunk, right after the previous one."""
+        if digest is None:
+            digest = chunk_digest(chunk, self.digest, self.digest_size)
+        self.file.write(struct.pack('<QI', self.data_size, len(chunk)) + digest)
+        self.count += 1
+        self.data_size += len(chunk)
+
+    def add_many(self, offsets, lengths, digests):
+        """Append a batch of rows from arrays; digests is an (n, digest_size) uint8 array or a list of bytes."""
+        records = np.empty(len(lengths), dtype=self.dtype)
+        records['offset'] = offsets
+        records['length'] = lengths
+        if isinstance(digests, np.ndarray):
+            records['digest'] = digests
+        else:
+            records['digest'] = np.frombuffer(b''.join(digests), dtype=np.uint8).reshape(-1, self.digest_size)
+        self.file.write(records.tobytes())
+        self.count += len(records)
+        if len(records):
+            self.data_size = int(records['offset'][-1]) + int(records['length'][-1])
+
+    def flush(self):
+        self.file.flush()
+        position = self.file.tell()
+        self.file.seek(0)
+        self.file.write(self._header())
+        self.file.seek(position)
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Manifest:
+    '''
+    Read-only view of a manifest file. The records are a numpy.memmap, so
+    offsets, lengths and digests are array columns paged in by the OS and
+    never turned into Python objects.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, self.header_size, self.digest_size, self.count, self.data_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a chunk manifest")
+            meta = json.loads(f.read(self.header_size - HEADER.size).rstrip(b'\0').decode('utf-8'))
+        self.algorithm = meta['algorithm']
+        self.params = meta['params']
+        self.digest = meta['digest']
+        self.dtype = record_dtype(self.digest_size)
+
+        available = (os.path.getsize(path) - self.header_size) // self.dtype.itemsize
+        if self.count > available:
+            raise ValueError(f"{path} is truncated: {available} of {self.count} records")
+        if self.count:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=self.header_size, shape=(self.count,))
+        else:
+            self.records = np.empty(0, dtype=self.dtype)
+
+    @property
+    def offsets(self):
+        return self.records['offset']
+
+    @property
+    def lengths(self):
+        return self.records['length']
+
+    @property
+    def digests(self):
+        return self.records['digest']
+
+    def __len__(self):
+        return self.count
+
+    def digest_at(self, index):
+        return self.records['digest'][index].tobytes()
+
+    def chunk_at(self, position):
+        """Index of the chunk holding byte position of the data."""
+        if not 0 <= position < self.data_size:
+            raise ValueError(f"Position {position} is outside the data ({self.data_size} bytes)")
+        return int(np.searchsorted(self.offsets, position, side='right')) - 1
+
+
+def write_manifest(path, chunker, readable, buffer_size=1 << 20, digest='blake2b', digest_size=32):
+    """Chunk a file object or byte iterator with chunker.chunk_stream straight into a manifest."""
+    with ManifestWriter.for_chunker(path, chunker, digest, digest_size) as writer:
+        for chunk in chunker.chunk_stream(readable, buffer_size=buffer_size):
+            writer.add(chunk)
+    return Manifest(path)
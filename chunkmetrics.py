@@ -0,0 +1,104 @@
+import time
+from array import array
+from collections import Counter
+import numpy as np
+
+
+def size_limit_profile(chunker, lengths):
+    """Bytes per region and cut reasons for chunkers cutting on a mask match between min_size and max_size.
+
+    Shared by GearChunker and RabinChunker: nothing is cut below min_size,
+    cuts are forced past max_size.
+    """
+    last = max(chunker.min_size, chunker.max_size)
+    regions = {
+        'skip': int(np.minimum(lengths, chunker.min_size).sum()),
+        'normal': int(np.clip(lengths - chunker.min_size, 0, None).sum()),
+    }
+    reasons = {
+        'mask': int((lengths <= last)[:-1].sum()),
+        'max_size': int((lengths > last).sum()),
+    }
+    return regions, reasons
+
+
+def profile_chunks(chunker, lengths, size):
+    """Bytes per region, cut reasons and hash updates of one run, worked out from its chunk lengths.
+
+    Each chunker's profile method knows where its loops hash and cut, so the
+    boundary loops themselves carry no counters. The last chunk is counted
+    as cut by the end of the data unless it hit the size limit.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    regions, reasons, hashed = chunker.profile(lengths, size)
+    if len(lengths):
+        reasons['end'] = int(len(lengths) - sum(reasons.values()))
+    return regions, reasons, hashed
+
+
+class ChunkMetrics:
+    '''
+    Counters for a chunker, attached with its metrics argument. With no
+    metrics object the chunkers only pay an `is None` test per call; with
+    one, every find_boundaries call or chunk_stream run adds its bytes per
+    region, cut reasons, hash updates (from the chunker's profile method)
+    and wall time per phase (as timed by the chunker) here, and
+    callback (if given) gets the numbers of that run as a dict.
+    '''
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        self.runs = 0
+        self.bytes = 0
+        self.chunks = 0
+        self.hash_updates = 0
+        self.region_bytes = Counter()
+        self.cut_reasons = Counter()
+        self.phase_seconds = Counter()
+
+    def record(self, chunker, size, boundaries, phases):
+        """Add one run: size bytes cut at boundaries, phases maps phase name to seconds."""
+        lengths = np.diff(np.asarray(boundaries, dtype=np.int64), prepend=0)
+        regions, reasons, hashed = profile_chunks(chunker, lengths, size)
+
+        self.runs += 1
+        self.bytes += size
+        self.chunks += len(lengths)
+        self.hash_updates += hashed
+        self.region_bytes.update(regions)
+        self.cut_reasons.update(reasons)
+        self.phase_seconds.update(phases)
+
+        if self.callback is not None:
+            self.callback({'chunker': type(chunker).__name__, 'bytes': size, 'chunks': len(lengths),
+                           'hash_updates': hashed, 'region_bytes': regions, 'cut_reasons': reasons,
+                           'phase_seconds': dict(phases)})
+
+    def wrap_stream(self, chunker, chunks):
+        """Pass chunks through and record the run once the stream is exhausted.
+
+        The 'stream' time is wall time from first to last chunk, so it
+        includes whatever the consumer does in between.
+        """
+        started = time.perf_counter()
+        lengths = array('q')
+        for chunk in chunks:
+            lengths.append(len(chunk))
+            yield chunk
+        ends = np.cumsum(np.frombuffer(lengths, dtype=np.int64))
+        self.record(chunker, int(ends[-1]) if len(ends) else 0, ends, {'stream': time.perf_counter() - started})
+
+    def as_dict(self):
+        return {
+            'runs': self.runs,
+            'bytes': self.bytes,
+            'chunks': self.chunks,
+            'hash_updates': self.hash_updates,
+            'region_bytes': dict(self.region_bytes),
+            'cut_reasons': dict(self.cut_reasons),
+            'phase_seconds': dict(self.phase_seconds),
+            'mb_per_s': self.bytes / sum(self.phase_seconds.values()) / 1e6 if sum(self.phase_seconds.values()) else 0.0,
+        }
@@ -0,0 +1,121 @@
+from array import array
+import numpy as np
+from chunkindex import chunk_digest
+from chunkmanifest import ManifestWriter
+
+
+class ChunkRef:
+    '''
+    One chunk of a ChunkSet. Only created on access, the set itself keeps
+    no per-chunk objects.
+    '''
+    __slots__ = ('offset', 'length', 'digest', 'source')
+
+    def __init__(self, offset, length, digest, source=None):
+        self.offset = offset
+        self.length = length
+        self.digest = digest
+        self.source = source
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def data(self):
+        """memoryview of the chunk in the chunked data, None if the set has no source."""
+        if self.source is None:
+            return None
+        return self.source[self.offset:self.offset + self.length]
+
+    def __bytes__(self):
+        if self.source is None:
+            raise ValueError("Chunk data is not available, the chunk set has no source")
+        return bytes(self.data)
+
+    def __repr__(self):
+        return f"ChunkRef(offset={self.offset}, length={self.length}, digest={self.digest.hex()[:16]}...)"
+
+
+class ChunkSet:
+    '''
+    Chunks as parallel arrays: uint64 offsets, uint32 lengths and an
+    (n, digest_size) uint8 digest array, about 12 + digest_size bytes per
+    chunk. source optionally keeps the chunked buffer (not copied) so
+    chunk contents can be sliced out on demand.
+    '''
+
+    def __init__(self, offsets, lengths, digests, source=None):
+        self.offsets = np.asarray(offsets, dtype=np.uint64)
+        self.lengths = np.asarray(lengths, dtype=np.uint32)
+        self.digests = np.asarray(digests, dtype=np.uint8)
+        self.digest_size = self.digests.shape[1] if self.digests.ndim == 2 else 0
+        self.source = source
+
+    @classmethod
+    def from_boundaries(cls, data, boundaries, digest_size=32):
+        """Chunk set of data cut at the end offsets boundaries (data is referenced, not copied)."""
+        ends = np.asarray(boundaries, dtype=np.int64)
+        starts = np.zeros_like(ends)
+        starts[1:] = ends[:-1]
+        digests = bytearray()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            digests += chunk_digest(data[start:end], digest_size=digest_size)
+        return cls(starts, ends - starts, np.frombuffer(bytes(digests), dtype=np.uint8).reshape(-1, digest_size), data)
+
+    @classmethod
+    def from_chunks(cls, chunks, digest_size=32):
+        """Chunk set of consecutive chunks, e.g. from chunk_stream; chunk contents are not kept."""
+        lengths = array('I')
+        digests = bytearray()
+        for chunk in chunks:
+            lengths.append(len(chunk))
+            digests += chunk_digest(chunk, digest_size=digest_size)
+        lengths = np.array(lengths, dtype=np.uint32)
+        offsets = np.zeros(len(lengths), dtype=np.uint64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        return cls(offsets, lengths, np.frombuffer(bytes(digests), dtype=np.uint8).reshape(-1, digest_size))
+
+    @classmethod
+    def from_manifest(cls, manifest, source=None):
+        """Chunk set of a chunkmanifest.Manifest (columns are copied out of the mapping)."""
+        return cls(np.array(manifest.offsets), np.array(manifest.lengths), np.array(manifest.digests), source)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ChunkSet(self.offsets[index], self.lengths[index], self.digests[index], self.source)
+        if index < 0:
+            index += len(self)
+        return ChunkRef(int(self.offsets[index]), int(self.lengths[index]), self.digests[index].tobytes(), self.source)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def ends(self):
+        return self.offsets + self.lengths
+
+    @property
+    def total_size(self):
+        return int(self.lengths.sum(dtype=np.uint64))
+
+    @property
+    def nbytes(self):
+        """Memory held by the arrays, the source buffer not included."""
+        return self.offsets.nbytes + self.lengths.nbytes + self.digests.nbytes
+
+    def unique(self):
+        """Mask of the first occurrence of every digest."""
+        keys = np.ascontiguousarray(self.digests).view(f'V{self.digest_size}').ravel()
+        _, first = np.unique(keys, return_index=True)
+        mask = np.zeros(len(self), dtype=bool)
+        mask[first] = True
+        return mask
+
+    def save(self, path, chunker, digest='blake2b'):
+        """Write the set as a chunkmanifest file described by chunker."""
+        with ManifestWriter.for_chunker(path, chunker, digest, self.digest_size) as writer:
+            writer.add_many(self.offsets, self.lengths, self.digests)
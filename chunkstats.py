@@ -0,0 +1,174 @@
+import math
+import numpy as np
+from chunkindex import chunk_digest
+
+
+class P2Quantile:
+    '''
+    Streaming quantile estimate with the P-square algorithm (Jain and
+    Chlamtac): five markers, O(1) memory and time per observation. The
+    first `exact` observations are kept so small inputs get exact values.
+    '''
+
+    def __init__(self, p, exact=512):
+        self.p = p
+        self.exact = exact
+        self.sample = []
+        self.heights = None
+        self.positions = None
+        self.desired = None
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def _start_markers(self):
+        # Seed the markers from the exact sample at their desired positions
+        n = len(self.sample)
+        self.desired = [1 + (n - 1) * f for f in self.increments]
+        self.positions = [round(d) for d in self.desired]
+        self.heights = [float(np.quantile(self.sample, f)) for f in self.increments]
+        self.sample = None
+
+    def update(self, x):
+        if self.heights is None:
+            self.sample.append(x)
+            if len(self.sample) >= max(self.exact, 5):
+                self._start_markers()
+            return
+
+        q = self.heights
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the three middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self):
+        if self.heights is not None:
+            return self.heights[2]
+        if not self.sample:
+            return 0
+        return float(np.quantile(self.sample, self.p))
+
+
+class ChunkStats:
+    '''
+    Online chunk statistics fed one chunk at a time: Welford mean/variance,
+    fixed-bin size histogram, P-square quantiles and digest-based
+    uniqueness. Memory does not grow with the number of chunks, apart from
+    one short digest per unique chunk.
+    '''
+
+    def __init__(self, min_size, avg_size, max_size, bins=64, quantiles=(0.5,), digest_size=16):
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        self.digest_size = digest_size
+
+        self.num_chunks = 0
+        self.total_size = 0
+        self.unique_size = 0
+        self.min_chunk = 0
+        self.max_chunk = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.digests = set()
+
+        # Longest chunk any of the chunkers can cut is one byte past the largest bound
+        self.upper = max(min_size, avg_size, max_size) + 1
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.size_distribution = [0, 0]
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+        if 0.5 not in self.quantiles:
+            self.quantiles[0.5] = P2Quantile(0.5)
+
+    def update(self, chunk, digest=None):
+        """Add one chunk (any bytes-like object); pass digest if it is already known."""
+        length = len(chunk)
+        if digest is None:
+            digest = chunk_digest(chunk, digest_size=self.digest_size)
+        if digest not in self.digests:
+            self.digests.add(digest)
+            self.unique_size += length
+        self.update_size(length)
+
+    def update_size(self, length):
+        """Add a chunk length to the size metrics only."""
+        self.num_chunks += 1
+        self.total_size += length
+        self.min_chunk = length if self.num_chunks == 1 else min(self.min_chunk, length)
+        self.max_chunk = max(self.max_chunk, length)
+
+        delta = length - self.mean
+        self.mean += delta / self.num_chunks
+        self.m2 += delta * (length - self.mean)
+
+        bins = len(self.counts)
+        self.counts[min(length * bins // self.upper, bins - 1)] += 1
+        if self.min_size <= length < self.avg_size:
+            self.size_distribution[0] += 1
+        elif self.avg_size <= length <= self.max_size:
+            self.size_distribution[1] += 1
+        for estimator in self.quantiles.values():
+            estimator.update(length)
+
+    def update_many(self, chunks):
+        """Add chunks; a ChunkSet (or Manifest) is read from its length and digest arrays."""
+        if hasattr(chunks, 'lengths') and hasattr(chunks, 'digests'):
+            size = chunks.digests.shape[1]
+            flat = np.ascontiguousarray(chunks.digests).tobytes()
+            for i, length in enumerate(chunks.lengths.tolist()):
+                digest = flat[i * size:(i + 1) * size]
+                if digest not in self.digests:
+                    self.digests.add(digest)
+                    self.unique_size += length
+                self.update_size(length)
+            return self
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def histogram(self):
+        """(counts, bin_edges) of chunk sizes over [0, largest possible chunk]."""
+        return self.counts.copy(), np.linspace(0, self.upper, len(self.counts) + 1)
+
+    def result(self, **extra):
+        stats = {
+            'num_chunks': self.num_chunks,
+            'unique_chunks': len(self.digests),
+            'total_size': self.total_size,
+            'unique_size': self.unique_size,
+            'dedup_rate': self.total_size / self.unique_size if self.unique_size > 0 else 1.0,
+            'min_chunk': self.min_chunk,
+            'max_chunk': self.max_chunk,
+            'avg_chunk': self.mean,
+            'median_chunk': self.quantiles[0.5].value(),
+            'std_dev': math.sqrt(self.m2 / self.num_chunks) if self.num_chunks else 0,
+            'quantiles': {p: estimator.value() for p, estimator in self.quantiles.items()},
+            'size_distribution': list(self.size_distribution),
+            'target_avg': self.avg_size,
+        }
+        stats.update(extra)
+        return stats
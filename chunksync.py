@@ -0,0 +1,145 @@
+"""Chunk-level diff and sync between two versions of the same data.
+
+The receiver chunks its old version and sends the chunk digests (its
+signature) to the sender. The sender chunks the new version with the same
+chunker parameters and builds a plan: the new version as a list of chunk
+digests, plus the data of only those chunks the signature does not
+contain. The receiver rebuilds the new version from its old chunks and the
+plan, so the bytes transferred follow the changed regions, not the file
+size.
+"""
+import struct
+from chunkindex import chunk_digest
+from chunkio import as_buffer
+
+MAGIC = b'CDCSYNC1'
+# magic, digest size, recipe length, payload chunk count, new data size
+HEADER = struct.Struct('<8sIQQQ')
+
+
+def chunk_digests(chunker, data, digest_size=32):
+    """(digest, offset, length) of every chunk of data, in order."""
+    data = as_buffer(data)
+    chunks = []
+    start = 0
+    for end in chunker.find_boundaries(data):
+        chunks.append((chunk_digest(data[start:end], digest_size=digest_size), start, end - start))
+        start = end
+    return chunks
+
+
+class SyncPlan:
+    '''
+    Transfer plan for one file: recipe lists the (digest, length) of every
+    chunk of the new version, payload holds the data of the chunks the
+    receiver lacks, each unique chunk once.
+    '''
+
+    def __init__(self, recipe, payload, digest_size=32):
+        self.recipe = recipe
+        self.payload = payload
+        self.digest_size = digest_size
+
+    @property
+    def new_size(self):
+        return sum(length for _, length in self.recipe)
+
+    @property
+    def payload_size(self):
+        return sum(len(data) for data in self.payload.values())
+
+    def transfer_size(self):
+        """Bytes of the serialized plan, i.e. what goes over the wire."""
+        record = self.digest_size + 4
+        return HEADER.size + len(self.recipe) * record + len(self.payload) * record + self.payload_size
+
+    def summary(self):
+        reused = sum(1 for digest, _ in self.recipe if digest not in self.payload)
+        return {
+            'chunks': len(self.recipe),
+            'reused_chunks': reused,
+            'sent_chunks': len(self.payload),
+            'new_size': self.new_size,
+            'payload_size': self.payload_size,
+            'transfer_size': self.transfer_size(),
+            'savings': 1 - self.transfer_size() / self.new_size if self.new_size else 0.0,
+        }
+
+    def write(self, f):
+        f.write(HEADER.pack(MAGIC, self.digest_size, len(self.recipe), len(self.payload), self.new_size))
+        for digest, length in self.recipe:
+            f.write(digest + struct.pack('<I', length))
+        for digest, data in self.payload.items():
+            f.write(digest + struct.pack('<I', len(data)))
+            f.write(data)
+
+    @classmethod
+    def read(cls, f):
+        magic, digest_size, count, payload_count, new_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Not a sync plan")
+        record = struct.Struct(f'<{digest_size}sI')
+        recipe = [record.unpack(f.read(record.size)) for _ in range(count)]
+        payload = {}
+        for _ in range(payload_count):
+            digest, length = record.unpack(f.read(record.size))
+            payload[digest] = f.read(length)
+        plan = cls(recipe, payload, digest_size)
+        if plan.new_size != new_size:
+            raise ValueError(f"Sync plan is damaged: recipe covers {plan.new_size} of {new_size} bytes")
+        return plan
+
+
+def make_plan(chunker, new_data, signature, digest_size=32):
+    """SyncPlan turning the version described by signature (digests the receiver has) into new_data."""
+    new_data = as_buffer(new_data)
+    known = set(signature)
+    recipe = []
+    payload = {}
+    for digest, offset, length in chunk_digests(chunker, new_data, digest_size):
+        recipe.append((digest, length))
+        if digest not in known and digest not in payload:
+            payload[digest] = bytes(new_data[offset:offset + length])
+    return SyncPlan(recipe, payload, digest_size)
+
+
+class LocalReceiver:
+    '''
+    Stand-in for the remote side: holds the old version, hands out its
+    signature and rebuilds the new version from a plan.
+    '''
+
+    def __init__(self, chunker, data, digest_size=32):
+        self.chunker = chunker
+        self.data = as_buffer(data)
+        self.digest_size = digest_size
+        self.chunks = {digest: (offset, length)
+                       for digest, offset, length in chunk_digests(chunker, self.data, digest_size)}
+
+    def signature(self):
+        """Digests of the old version's chunks, all the sender needs to know about it."""
+        return list(self.chunks)
+
+    def apply(self, plan, out, verify=True):
+        """Write the new version to the file object out; returns its size."""
+        written = 0
+        for digest, length in plan.recipe:
+            data = plan.payload.get(digest)
+            if data is None:
+                if digest not in self.chunks:
+                    raise ValueError(f"Chunk {digest.hex()} is neither local nor in the plan")
+                offset, length = self.chunks[digest]
+                data = self.data[offset:offset + length]
+            if verify and chunk_digest(data, digest_size=self.digest_size) != digest:
+                raise ValueError(f"Chunk {digest.hex()} does not match its digest")
+            out.write(data)
+            written += len(data)
+        return written
+
+
+def sync(chunker, old_data, new_data, out, digest_size=32):
+    """Run a full local sync of old_data to new_data into out, returns the plan summary."""
+    receiver = LocalReceiver(chunker, old_data, digest_size)
+    plan = make_plan(chunker, new_data, receiver.signature(), digest_size)
+    receiver.apply(plan, out)
+    return plan.summary()
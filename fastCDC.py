@@ -1,10 +1,27 @@
-import secrets as s
+import time
 import numpy as np
+from chunkio import as_buffer, chunk_file, read_buffers, split_chunks
+from chunkstats import ChunkStats
+from gearhashing import DEFAULT_SEED, gear_table_digest, make_gear_table
+from parallelchunking import parallel_boundaries
+from incrementalchunking import rechunk
 
 class fastCDC:
+    # the hash starts from zero at every cut
+    resets_hash = True
 
-    def __init__(self, min_size=2048, avg_size=8192, max_size=16384, norm_level=3):
-
+    def __init__(self, min_size=2048, avg_size=8192, max_size=16384, norm_level=3, seed=DEFAULT_SEED, gear_table=None,
+                 mode='classic', metrics=None):
+        '''
+        seed/gear_table fix the gear table so boundaries are reproducible,
+        gear_table overrides seed (e.g. a table from load_gear_table)
+        modes: classic (one byte per step), 2020 (skip + two bytes per step,
+        same boundaries as classic)
+        metrics: optional chunkmetrics.ChunkMetrics that collects per-run counters
+        '''
+        if mode not in ('classic', '2020'):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
 
         self.hash_lenght = 64
         self.min_size = min_size
@@ -22,11 +39,20 @@ class fastCDC:
         self.large_mask = self.create_mask(self.large_mask_bits)
         self.small_mask = self.create_mask(self.small_mask_bits)
         
-        self.gear_table = self.initialize_gear_table()
+        # an explicit table has no seed
+        self.seed = None if gear_table is not None else seed
+        self.gear_table = self.initialize_gear_table(gear_table)
+        # pre-shifted table for the first byte of each two-byte step
+        self.gear_table_ls = [value << 1 for value in self.gear_table]
         self.hash = 0
+        self.metrics = metrics
 
-    def initialize_gear_table(self):
-        return [s.randbits(self.hash_lenght) for _ in range(256)] 
+    def initialize_gear_table(self, gear_table=None):
+        if gear_table is not None:
+            if len(gear_table) != 256:
+                raise ValueError(f"Gear table must have 256 entries, got {len(gear_table)}")
+            return [int(value) & ((1 << self.hash_lenght) - 1) for value in gear_table]
+        return make_gear_table(self.seed, self.hash_lenght)
     
 
     def create_mask(self, length):
@@ -62,9 +88,58 @@ class fastCDC:
     
 
 
-    def chunk_data(self, data: str):
-        data = data.encode('utf-8')
-        chunks = []
+    def find_boundaries(self, data):
+        """Chunk end offsets for data."""
+        metrics = self.metrics
+        if metrics is None:
+            return self.find_boundaries_2020(data) if self.mode == '2020' else self.find_boundaries_classic(data)
+        if self.mode == '2020':
+            phases = {'skip': 0.0, 'normal': 0.0, 'emergency': 0.0}
+            boundaries = self.find_boundaries_2020(data, phases)
+        else:
+            started = time.perf_counter()
+            boundaries = self.find_boundaries_classic(data)
+            phases = {'loop': time.perf_counter() - started}
+        metrics.record(self, len(data), boundaries, phases)
+        return boundaries
+
+    def describe(self):
+        """(algorithm, params) for chunk manifests: everything the boundaries depend on."""
+        params = {'min_size': self.min_size, 'avg_size': self.avg_size, 'max_size': self.max_size,
+                  'norm_level': self.norm_level, 'seed': self.seed, 'mode': self.mode}
+        if self.seed is None:
+            # an explicit or random table is only identified by its contents
+            params['gear_table'] = gear_table_digest(self.gear_table)
+        return 'fastcdc', params
+
+    def profile(self, lengths, size):
+        """Bytes per region, cut reasons and hash updates of a run cut into chunks of lengths (see chunkmetrics)."""
+        normal = self.normalized_size
+        emergency = max(self.avg_size, normal)
+        forced = max(self.max_size, self.avg_size, normal)
+        regions = {
+            'skip': int(np.minimum(lengths, normal).sum()),
+            'normal': int(np.clip(lengths - normal, 0, emergency - normal).sum()),
+            'emergency': int(np.clip(lengths - emergency, 0, None).sum()),
+        }
+        cut_at = lengths - 1
+        reasons = {
+            'large_mask': int((cut_at < emergency)[:-1].sum()),
+            'small_mask': int(((cut_at >= emergency) & (cut_at < forced))[:-1].sum()),
+            'max_size': int((cut_at >= forced).sum()),
+        }
+        if self.mode == '2020':
+            # the skip region is only hashed over its last hash_lenght bytes,
+            # and a forced cut is made without hashing its byte
+            skipped = np.minimum(lengths, max(0, normal - self.hash_lenght))
+            hashed = int((lengths - skipped).sum()) - reasons['max_size']
+        else:
+            hashed = size
+        return regions, reasons, hashed
+
+    def find_boundaries_classic(self, data):
+        """Chunk end offsets for data, one hash update per byte."""
+        boundaries = []
         start = 0
         position = 0
         self.reset_hash()
@@ -84,7 +159,7 @@ class fastCDC:
             if position < self.avg_size:
                 if (self.hash & self.large_mask) == self.large_mask:
                     # Cut point found - hash matches pattern
-                    chunks.append(data[start:i+1])
+                    boundaries.append(i + 1)
                     start = i + 1
                     position = 0
                     self.reset_hash()
@@ -92,41 +167,185 @@ class fastCDC:
             else:
                 if (self.hash & self.small_mask) == self.small_mask or position >= self.max_size:
                     # Emergency cut or max size reached
-                    chunks.append(data[start:i+1])
+                    boundaries.append(i + 1)
                     start = i + 1
                     position = 0
                     self.reset_hash()
         
         # Add remaining data
         if start < len(data):
-            chunks.append(data[start:])
+            boundaries.append(len(data))
         
-        return chunks
+        return boundaries
+
+    def roll_two(self, data, i, stop, h, mask):
+        """Roll the hash over data[i:stop] two bytes per step, checking mask at every byte.
+
+        Returns (index of the matching byte or None, hash). The first byte of
+        a step uses the pre-shifted table, so the intermediate value is the
+        hash shifted left by one and is tested against the shifted mask.
+        """
+        gear, gear_ls = self.gear_table, self.gear_table_ls
+        mask_ls = mask << 1
+        while i + 1 < stop:
+            h = ((h << 2) + gear_ls[data[i]]) & 0x1FFFFFFFFFFFFFFFF
+            if (h & mask_ls) == mask_ls:
+                return i, h >> 1
+            h = (h + gear[data[i + 1]]) & 0xFFFFFFFFFFFFFFFF
+            if (h & mask) == mask:
+                return i + 1, h
+            i += 2
+        if i < stop:
+            h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFFFFFFFFFF
+            if (h & mask) == mask:
+                return i, h
+        return None, h
+
+    def find_boundaries_2020(self, data, phases=None):
+        """Chunk end offsets for data, FastCDC 2020 style.
+
+        No cut can happen below normalized_size, so hashing starts only
+        hash_lenght bytes before it: a 64-bit gear hash forgets older bytes,
+        which keeps the boundaries identical to the classic loop. phases, if
+        given, gets the seconds spent in each region added to its
+        'skip', 'normal' and 'emergency' entries.
+        """
+        gear, gear_ls = self.gear_table, self.gear_table_ls
+        boundaries = []
+        start = 0
+        n = len(data)
+
+        while start < n:
+            if phases is not None:
+                entered = time.perf_counter()
+            # Region 1: Skip region, only the last hash_lenght bytes are hashed
+            i = start + max(0, self.normalized_size - self.hash_lenght)
+            normal = min(n, start + self.normalized_size)
+            h = 0
+            while i + 1 < normal:
+                h = ((h << 2) + gear_ls[data[i]] + gear[data[i + 1]]) & 0xFFFFFFFFFFFFFFFF
+                i += 2
+            if i < normal:
+                h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFFFFFFFFFF
+
+            if phases is not None:
+                skipped = time.perf_counter()
+                phases['skip'] += skipped - entered
+
+            # Region 2: Normal chunking with large mask
+            emergency = start + max(self.avg_size, self.normalized_size)
+            cut, h = self.roll_two(data, normal, min(n, emergency), h, self.large_mask)
+            if phases is not None:
+                rolled = time.perf_counter()
+                phases['normal'] += rolled - skipped
+
+            # Region 3: Emergency cut with small mask, forced at max_size
+            forced = start + max(self.max_size, self.avg_size, self.normalized_size)
+            if cut is None and emergency < n:
+                cut, h = self.roll_two(data, emergency, min(n, forced), h, self.small_mask)
+                if cut is None and forced < n:
+                    cut = forced
+                if phases is not None:
+                    phases['emergency'] += time.perf_counter() - rolled
+
+            if cut is None:
+                boundaries.append(n)
+                break
+            boundaries.append(cut + 1)
+            start = cut + 1
+
+        return boundaries
+
+    def find_boundaries_parallel(self, data, workers=None, segment_size=None):
+        """Same as find_boundaries, spread over a process pool."""
+        return parallel_boundaries(self, data, workers, segment_size)
+
+    def rechunk(self, data, boundaries, edits):
+        """find_boundaries of edited data, re-chunking only around the edits (see incrementalchunking.rechunk)."""
+        return rechunk(self, data, boundaries, edits)
+
+    def chunk_data(self, data, output='bytes'):
+        '''
+        data: str (UTF-8 encoded) or any bytes-like object, used without copying
+        output: bytes, views (memoryview slices), offsets ((offset, length) array)
+        or chunkset (ChunkSet of offsets, lengths and digests)
+        '''
+        data = as_buffer(data)
+        return split_chunks(data, self.find_boundaries(data), output)
+
+    def chunk_file(self, path):
+        """Chunk end offsets of the file at path, scanned through mmap."""
+        return chunk_file(self, path)
+
+    def chunk_stream(self, readable, buffer_size=1 << 20):
+        """Yield chunks from a file object or byte iterator, buffer by buffer."""
+        if self.mode == '2020':
+            chunks = self.chunk_stream_2020(readable, buffer_size)
+        else:
+            chunks = self.chunk_stream_classic(readable, buffer_size)
+        return chunks if self.metrics is None else self.metrics.wrap_stream(self, chunks)
+
+    def chunk_stream_classic(self, readable, buffer_size=1 << 20):
+        """chunk_stream for the classic mode.
+
+        Same regions as chunk_data; the hash and the partial chunk are carried
+        across buffer edges so only max_size + buffer_size bytes are held.
+        """
+        pending = bytearray()
+        self.reset_hash()
+
+        for data in read_buffers(readable, buffer_size):
+            start = 0
+            for i in range(len(data)):
+                position = len(pending) + i - start
+                self.hash_expand(data[i])
+
+                # Region 1: Skip region (no boundary detection)
+                if position < self.normalized_size:
+                    continue
+                # Region 2: Normal chunking with large mask
+                if position < self.avg_size:
+                    cut = (self.hash & self.large_mask) == self.large_mask
+                # Region 3: Emergency cut with small mask
+                else:
+                    cut = (self.hash & self.small_mask) == self.small_mask or position >= self.max_size
+
+                if cut:
+                    pending += data[start:i+1]
+                    yield bytes(pending)
+                    pending.clear()
+                    start = i + 1
+                    self.reset_hash()
+
+            pending += data[start:]
+
+        # Add remaining data
+        if pending:
+            yield bytes(pending)
+    
+    def chunk_stream_2020(self, readable, buffer_size=1 << 20):
+        """chunk_stream for the 2020 mode.
+
+        The hash is reset at every cut, so each buffer is searched together
+        with the partial chunk left from the previous one; the last end
+        offset is only where the data stops and stays pending.
+        """
+        pending = bytearray()
+        for data in read_buffers(readable, buffer_size):
+            pending += data
+            start = 0
+            for end in self.find_boundaries_2020(pending)[:-1]:
+                yield bytes(pending[start:end])
+                start = end
+            del pending[:start]
+
+        if pending:
+            yield bytes(pending)
     
     def analyze_chunks(self, chunks):
-        """Calculate statistics for chunked data."""
-        sizes = [len(chunk) for chunk in chunks]
-        
-        unique_chunks = set(chunks)
-        unique_size = sum(len(chunk) for chunk in unique_chunks)
-        total_size = sum(sizes)
-
-        dedup_rate = total_size / unique_size if unique_size > 0 else 1.0
-
-        stats = {
-            'num_chunks': len(chunks),
-            'unique_chunks': len(unique_chunks), 
-            'total_size': total_size,
-            'unique_size': unique_size,          
-            'dedup_rate': dedup_rate,          
-            'min_chunk': min(sizes) if sizes else 0,
-            'max_chunk': max(sizes) if sizes else 0,
-            'avg_chunk': np.mean(sizes) if sizes else 0,
-            'median_chunk': np.median(sizes) if sizes else 0,
-            'std_dev': np.std(sizes) if sizes else 0,
-            'target_avg': self.avg_size,
-        }
-        
-        return stats, sizes
+        """Calculate statistics for chunked data in a single pass.
 
-fs=fastCDC ()
\ No newline at end of file
+        Returns the stats dict and the (counts, bin_edges) size histogram.
+        """
+        stats = ChunkStats(self.min_size, self.avg_size, self.max_size).update_many(chunks)
+        return stats.result(), stats.histogram()
@@ -1,13 +1,68 @@
 import secrets as s
+import hashlib
+import json
 import numpy as np
+from chunkio import as_buffer, block_candidates, chunk_file, split_chunks, stream_chunks, walk_boundaries
+from chunkmetrics import size_limit_profile
+from chunkstats import ChunkStats
+from parallelchunking import parallel_boundaries
+from incrementalchunking import rechunk
+
+DEFAULT_SEED = 0
+
+
+def make_gear_table(seed=DEFAULT_SEED, bits=64):
+    """Gear table derived from seed with BLAKE2b, identical on every host and run.
+
+    seed=None draws a random table instead, as the chunkers used to.
+    """
+    if seed is None:
+        return [s.randbits(bits) for _ in range(256)]
+    table = []
+    for i in range(256):
+        digest = hashlib.blake2b(f"{seed}:{i}".encode('utf-8'), digest_size=(bits + 7) // 8).digest()
+        table.append(int.from_bytes(digest, 'big') & ((1 << bits) - 1))
+    return table
+
+
+def save_gear_table(table, path):
+    """Persist a gear table as a JSON list of hex values."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([f"{value:x}" for value in table], f, indent=0)
+
+
+def load_gear_table(path):
+    """Read a gear table written by save_gear_table."""
+    with open(path, 'r', encoding='utf-8') as f:
+        table = [int(value, 16) for value in json.load(f)]
+    if len(table) != 256:
+        raise ValueError(f"Gear table must have 256 entries, got {len(table)}")
+    return table
+
+
+def gear_table_digest(table):
+    """BLAKE2b of a gear table's values (packed little-endian uint64), to identify tables that have no seed."""
+    return hashlib.blake2b(np.asarray(table, dtype='<u8').tobytes(), digest_size=16).hexdigest()
+
+
 class GearHashing:
-    def __init__(self, window_size=64):
+    def __init__(self, window_size=64, seed=DEFAULT_SEED, gear_table=None):
+        '''
+        gear_table overrides seed, e.g. a table from load_gear_table
+        (seed is then None)
+        '''
         self.window_size = window_size
-        self.gear_table = self._initialize_gear_table()
+        self.seed = None if gear_table is not None else seed
+        self.gear_table = self._initialize_gear_table(gear_table)
+        self.gear_array = np.array(self.gear_table, dtype=np.uint64)
         self.hash = 0
 
-    def _initialize_gear_table(self):
-        return [s.randbits(self.window_size) for _ in range(256)] 
+    def _initialize_gear_table(self, gear_table=None):
+        if gear_table is not None:
+            if len(gear_table) != 256:
+                raise ValueError(f"Gear table must have 256 entries, got {len(gear_table)}")
+            return [int(value) & ((1 << self.window_size) - 1) for value in gear_table]
+        return make_gear_table(self.seed, self.window_size)
 
     def compute_hash(self, data):
         data = data.encode('utf-8')     
@@ -21,22 +76,118 @@ class GearHashing:
     def hash_expand(self, new_byte: int):
         self.hash = ((self.hash << 1) + self.gear_table[new_byte]) & ((1 << self.window_size) - 1)
         return self.hash  
+
+    def hash_block(self, data, history=b''):
+        """Gear hash at every position of data, computed with uint64 array ops.
+
+        The hash at position i only depends on the last window_size bytes, so
+        it is built by doubling the covered window (1, 2, 4, ... bytes) instead
+        of rolling byte by byte. history holds the bytes preceding data; a
+        short history behaves like a freshly reset hash.
+        """
+        block = np.frombuffer(data, dtype=np.uint8)
+        hist = np.frombuffer(history, dtype=np.uint8)
+        hist = hist[max(0, len(hist) - self.window_size + 1):]
+        hashes = self.gear_array[np.concatenate((hist, block))]
+        width = 1
+        while width < self.window_size:
+            hashes[width:] += hashes[:-width] << np.uint64(width)
+            width *= 2
+        if self.window_size < 64:
+            hashes &= np.uint64((1 << self.window_size) - 1)
+        return hashes[len(hist):]
     
 
 
 class GearChunker:
-    def __init__(self, min_size=2048, avg_size=8192, max_size=16384):
-        
+    # the hash starts from zero at every cut
+    resets_hash = True
+
+    def __init__(self, min_size=2048, avg_size=8192, max_size=16384, engine='numpy', block_size=1 << 15,
+                 seed=DEFAULT_SEED, gear_table=None, metrics=None):
+        '''
+        engines: numpy (vectorized), python (byte loop)
+        seed/gear_table fix the gear table so boundaries are reproducible
+        metrics: optional chunkmetrics.ChunkMetrics that collects per-run counters
+        '''
+        if engine not in ('numpy', 'python'):
+            raise ValueError(f"Unknown engine: {engine}")
+
         self.window_size = 64
-        self.gear = GearHashing(window_size=64)
+        self.gear = GearHashing(window_size=64, seed=seed, gear_table=gear_table)
         self.min_size = min_size
         self.avg_size = avg_size
         self.max_size = max_size
         self.mask = (1 << ((avg_size-1).bit_length())) - 1
+        self.engine = engine
+        self.block_size = block_size
+        self.metrics = metrics
+
+    def find_candidates(self, data, history=b''):
+        """Positions where the full-window hash matches the mask, block by block."""
+        return block_candidates(self, self.gear.hash_block, data, history)
+
+    def next_cut(self, data, candidates, start):
+        """End offset of the chunk starting at start, or None if data runs out first."""
+        first = start + self.min_size
+        last = start + max(self.min_size, self.max_size)
+        warm = start + self.window_size - 1
+
+        # Right after a reset the hash covers fewer than window_size bytes and
+        # differs from the full-window hash, so check those positions directly
+        if first < warm:
+            h = 0
+            for i in range(start, min(warm, last + 1, len(data))):
+                h = ((h << 1) + self.gear.gear_table[data[i]]) & ((1 << self.window_size) - 1)
+                if i >= first and ((h & self.mask) == 0 or i >= last):
+                    return i + 1
+            first = warm
+
+        k = np.searchsorted(candidates, first)
+        if k < len(candidates) and candidates[k] <= last:
+            return int(candidates[k]) + 1
+        if last < len(data):
+            return last + 1
+        return None
+
+    def find_boundaries(self, data):
+        """Chunk end offsets for data."""
+        return walk_boundaries(self, data)
+
+    def describe(self):
+        """(algorithm, params) for chunk manifests: everything the boundaries depend on."""
+        params = {'min_size': self.min_size, 'avg_size': self.avg_size, 'max_size': self.max_size,
+                  'seed': self.gear.seed}
+        if self.gear.seed is None:
+            # an explicit or random table is only identified by its contents
+            params['gear_table'] = gear_table_digest(self.gear.gear_table)
+        return 'gear', params
 
-    def chunk_data(self, data: str):
-        data = data.encode('utf-8')
-        chunks = []
+    def profile(self, lengths, size):
+        """Bytes per region, cut reasons and hash updates of a run cut into chunks of lengths (see chunkmetrics)."""
+        regions, reasons = size_limit_profile(self, lengths)
+        hashed = size
+        if self.engine == 'numpy' and size:
+            # each vectorized block also hashes the window before it
+            blocks = -(-size // self.block_size)
+            hashed += (blocks - 1) * (self.window_size - 1)
+        # right after a reset next_cut re-hashes up to window_size - 1 bytes one by one
+        warm = self.window_size - 1
+        if self.engine == 'numpy' and self.min_size < warm:
+            hashed += int(np.minimum(lengths, warm).sum())
+        return regions, reasons, hashed
+
+    def find_boundaries_parallel(self, data, workers=None, segment_size=None):
+        """Same as find_boundaries, spread over a process pool."""
+        return parallel_boundaries(self, data, workers, segment_size)
+
+    def rechunk(self, data, boundaries, edits):
+        """find_boundaries of edited data, re-chunking only around the edits (see incrementalchunking.rechunk)."""
+        return rechunk(self, data, boundaries, edits)
+
+    def loop_boundaries(self, data):
+        """Chunk end offsets for data, one hash update per byte."""
+        boundaries = []
         start = 0
         self.gear.reset_hash()
 
@@ -45,38 +196,37 @@ class GearChunker:
             self.gear.hash_expand(byte)
 
             if (i - start >= self.min_size) and ((self.gear.hash & self.mask) == 0 or (i - start) >= self.max_size):
-                chunks.append(data[start:i+1])
+                boundaries.append(i + 1)
                 start = i + 1
                 self.gear.reset_hash()
 
         if start < len(data):
-            chunks.append(data[start:])
+            boundaries.append(len(data))
+
+        return boundaries
 
-        return chunks
+    def chunk_file(self, path):
+        """Chunk end offsets of the file at path, scanned through mmap."""
+        return chunk_file(self, path)
+
+    def chunk_stream(self, readable, buffer_size=1 << 20):
+        """Yield chunks from a file object or byte iterator, buffer by buffer."""
+        chunks = stream_chunks(self, readable, buffer_size)
+        return chunks if self.metrics is None else self.metrics.wrap_stream(self, chunks)
+
+    def chunk_data(self, data, output='bytes'):
+        '''
+        data: str (UTF-8 encoded) or any bytes-like object, used without copying
+        output: bytes, views (memoryview slices), offsets ((offset, length) array)
+        or chunkset (ChunkSet of offsets, lengths and digests)
+        '''
+        data = as_buffer(data)
+        return split_chunks(data, self.find_boundaries(data), output)
     
     def analyze_chunks(self, chunks):
-        """Calculate statistics for chunked data."""
-        sizes = [len(chunk) for chunk in chunks]
-        
-        unique_chunks = set(chunks)
-        unique_size = sum(len(chunk) for chunk in unique_chunks)
-        total_size = sum(sizes)
-        
-        dedup_rate = total_size / unique_size if unique_size > 0 else 1.0
-
-        stats = {
-            'num_chunks': len(chunks),
-            'unique_chunks': len(unique_chunks), 
-            'total_size': total_size,
-            'unique_size': unique_size,          
-            'dedup_rate': dedup_rate,            
-            'min_chunk': min(sizes) if sizes else 0,
-            'max_chunk': max(sizes) if sizes else 0,
-            'avg_chunk': np.mean(sizes) if sizes else 0,
-            'median_chunk': np.median(sizes) if sizes else 0,
-            'std_dev': np.std(sizes) if sizes else 0,
-            'target_avg': self.avg_size,
-            'window_size': self.window_size,
-        }
-        
-        return stats, sizes
\ No newline at end of file
+        """Calculate statistics for chunked data in a single pass.
+
+        Returns the stats dict and the (counts, bin_edges) size histogram.
+        """
+        stats = ChunkStats(self.min_size, self.avg_size, self.max_size).update_many(chunks)
+        return stats.result(window_size=self.window_size), stats.histogram()
\ No newline at end of file
@@ -1,14 +1,109 @@
+import io
+import os
+import queue
+import threading
+import time
+from array import array
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import ttk, scrolledtext, filedialog, messagebox
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
-import numpy as np
 from rabinfingerprint import RabinChunker
 from gearhashing import GearChunker
 from fastCDC import fastCDC
 
+class ChunkListView(ttk.Frame):
+    '''
+    Chunk list that only renders the rows in view. Chunks are given as an
+    array of end offsets and their previews are read from the source when a
+    row is drawn, so the list costs the same with 20 chunks or 20 million.
+    '''
+    PREVIEW_BYTES = 60
+    
+    def __init__(self, master, on_select=None):
+        super().__init__(master)
+        self.on_select = on_select
+        self.title = ""
+        self.ends = np.empty(0, dtype=np.int64)
+        self.open_source = None
+        self.first = 0
+        
+        self.text = tk.Text(self, wrap=tk.NONE, state=tk.DISABLED, cursor="arrow")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.line_height = tkfont.Font(font=self.text.cget("font")).metrics("linespace")
+        
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        self.text.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        self.text.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+        self.text.bind("<Button-1>", self.select)
+    
+    def set_chunks(self, title, ends, open_source):
+        self.title = title
+        self.ends = ends
+        self.open_source = open_source
+        self.first = 0
+        self.render()
+    
+    def clear(self):
+        self.set_chunks("", np.empty(0, dtype=np.int64), None)
+    
+    def visible_rows(self):
+        # one line is taken by the header
+        return max(1, self.text.winfo_height() // self.line_height - 1)
+    
+    def scroll(self, amount, what):
+        step = self.visible_rows() if what == "pages" else 1
+        self.first = max(0, min(self.first + amount * step, len(self.ends) - self.visible_rows()))
+        self.render()
+    
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.first = max(0, min(int(float(args[1]) * len(self.ends)), len(self.ends) - self.visible_rows()))
+            self.render()
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+    
+    def select(self, event):
+        row = int(self.text.index(f"@{event.x},{event.y}").split(".")[0]) - 2
+        if self.on_select and 0 <= row and self.first + row < len(self.ends):
+            self.on_select(self.first + row)
+    
+    def render(self):
+        count = len(self.ends)
+        last = min(count, self.first + self.visible_rows())
+        lines = [f"📦 Chunk Preview - {self.title} ({count:,} total chunks)" if count else ""]
+        if count:
+            with self.open_source() as source:
+                for i in range(self.first, last):
+                    start = int(self.ends[i - 1]) if i else 0
+                    size = int(self.ends[i]) - start
+                    source.seek(start)
+                    preview = source.read(min(size, self.PREVIEW_BYTES)).decode('utf-8', errors='replace')
+                    preview = preview.replace('\n', '\\n').replace('\r', ' ').replace('\t', ' ')
+                    lines.append(f"Chunk {i:9,d} | Offset: {start:14,d} | Size: {size:7,d} | {preview}")
+        
+        self.text.config(state=tk.NORMAL)
+        self.text.delete(1.0, tk.END)
+        self.text.insert(1.0, "\n".join(lines))
+        self.text.config(state=tk.DISABLED)
+        if count:
+            self.scrollbar.set(self.first / count, last / count)
+        else:
+            self.scrollbar.set(0, 1)
+
+
 class RabinChunkerGUI:
+    # Bytes of a loaded file shown in the input box
+    PREVIEW_SIZE = 4096
+    # Bytes of a chunk shown in the details box
+    DETAIL_SIZE = 1 << 16
+    
     def __init__(self, root):
         self.root = root
         self.root.title("CDC Chunker Comparison - Rabin vs Gear vs FastCDC")
@@ -17,15 +112,26 @@ class RabinChunkerGUI:
         self.rabin_chunker = None
         self.gear_chunker = None
         self.fastcdc_chunker = None
-        self.rabin_chunks = []
-        self.gear_chunks = []
-        self.fastcdc_chunks = []
+        self.rabin_ends = None
+        self.gear_ends = None
+        self.fastcdc_ends = None
         self.rabin_stats = {}
         self.gear_stats = {}
         self.fastcdc_stats = {}
-        self.rabin_sizes = []
-        self.gear_sizes = []
-        self.fastcdc_sizes = []
+        self.rabin_hist = None
+        self.gear_hist = None
+        self.fastcdc_hist = None
+        
+        # Loaded file, chunked straight from disk instead of the text widget
+        self.source_path = None
+        self.source_size = 0
+        # Opens the data of the last run, chunk contents are read back from it
+        self.chunked_source = None
+        
+        # Background chunking run
+        self.worker = None
+        self.cancel_event = threading.Event()
+        self.results = queue.Queue()
         
         self.create_widgets()
         
@@ -66,6 +172,11 @@ class RabinChunkerGUI:
                                      values=["sqrt", "log"], width=12, state="readonly")
         window_combo.grid(row=1, column=1, padx=5, pady=5)
         
+        # Gear Seed (for Gear and FastCDC, fixed so results are reproducible)
+        ttk.Label(params_frame, text="Gear Seed:").grid(row=1, column=2, sticky=tk.W, padx=5, pady=5)
+        self.seed_var = tk.IntVar(value=0)
+        ttk.Entry(params_frame, textvariable=self.seed_var, width=15).grid(row=1, column=3, padx=5, pady=5)
+        
         # Norm Level (for FastCDC only)
         ttk.Label(params_frame, text="Norm Level:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
         self.norm_level_var = tk.IntVar(value=3)
@@ -80,15 +191,31 @@ class RabinChunkerGUI:
         
         # Buttons
         ttk.Button(params_frame, text="Load File", command=self.load_file).grid(row=2, column=4, padx=5, pady=5)
-        ttk.Button(params_frame, text="Chunk Data", command=self.chunk_data).grid(row=2, column=5, padx=5, pady=5)
+        self.chunk_button = ttk.Button(params_frame, text="Chunk Data", command=self.chunk_data)
+        self.chunk_button.grid(row=2, column=5, padx=5, pady=5)
         ttk.Button(params_frame, text="Clear", command=self.clear_results).grid(row=2, column=6, padx=5, pady=5)
         
+        # Progress of the background run
+        self.progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(params_frame, variable=self.progress_var, maximum=100).grid(
+            row=3, column=0, columnspan=4, sticky=(tk.W, tk.E), padx=5, pady=5)
+        self.status_var = tk.StringVar(value="Idle")
+        ttk.Label(params_frame, textvariable=self.status_var).grid(row=3, column=4, columnspan=2, sticky=tk.W, padx=5, pady=5)
+        self.cancel_button = ttk.Button(params_frame, text="Cancel", command=self.cancel_chunking, state=tk.DISABLED)
+        self.cancel_button.grid(row=3, column=6, padx=5, pady=5)
+        
         # ===== Left Panel: Text Input/Output =====
         left_frame = ttk.Frame(main_frame)
         left_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 5))
         
         # Input Text
-        ttk.Label(left_frame, text="Input Data:").pack(anchor=tk.W)
+        input_header = ttk.Frame(left_frame)
+        input_header.pack(fill=tk.X)
+        ttk.Label(input_header, text="Input Data:").pack(side=tk.LEFT)
+        self.source_var = tk.StringVar(value="")
+        ttk.Label(input_header, textvariable=self.source_var).pack(side=tk.LEFT, padx=5)
+        self.close_file_button = ttk.Button(input_header, text="Close File", command=self.close_file, state=tk.DISABLED)
+        self.close_file_button.pack(side=tk.RIGHT)
         self.input_text = scrolledtext.ScrolledText(left_frame, height=10, width=50, wrap=tk.WORD)
         self.input_text.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
@@ -105,16 +232,21 @@ class RabinChunkerGUI:
         self.notebook = ttk.Notebook(right_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True)
         
-        # Tab 1: Histogram
+        # Tab 1: Histogram, one figure redrawn in place on every update
         self.hist_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.hist_frame, text="Size Distribution")
         
+        self.hist_figure = Figure(figsize=(8, 6), dpi=100)
+        self.hist_ax = self.hist_figure.add_subplot(111)
+        self.hist_canvas = FigureCanvasTkAgg(self.hist_figure, master=self.hist_frame)
+        self.hist_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        
         # Tab 2: Chunk List
         self.chunks_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.chunks_frame, text="Chunk Preview")
         
-        self.chunks_text = scrolledtext.ScrolledText(self.chunks_frame, wrap=tk.WORD)
-        self.chunks_text.pack(fill=tk.BOTH, expand=True)
+        self.chunk_list = ChunkListView(self.chunks_frame, on_select=self.select_chunk)
+        self.chunk_list.pack(fill=tk.BOTH, expand=True)
         
         # ===== Bottom: Chunk Details =====
         details_frame = ttk.LabelFrame(main_frame, text="Chunk Details", padding="10")
@@ -137,15 +269,36 @@ class RabinChunkerGUI:
         filename = filedialog.askopenfilename(title="Select file to chunk")
         if filename:
             try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    data = f.read()
+                # Only a preview goes into the text widget, the chunkers read the file itself
+                with open(filename, 'rb') as f:
+                    preview = f.read(self.PREVIEW_SIZE)
+                self.source_path = filename
+                self.source_size = os.path.getsize(filename)
+                
+                self.input_text.config(state=tk.NORMAL)
                 self.input_text.delete(1.0, tk.END)
-                self.input_text.insert(1.0, data)
-                messagebox.showinfo("Success", f"Loaded {len(data)} bytes from file")
+                self.input_text.insert(1.0, preview.decode('utf-8', errors='replace'))
+                if self.source_size > len(preview):
+                    self.input_text.insert(tk.END, f"\n\n... preview of the first {len(preview):,} bytes ...")
+                self.input_text.config(state=tk.DISABLED)
+                
+                self.source_var.set(f"{os.path.basename(filename)} ({self.source_size:,} bytes)")
+                self.close_file_button.config(state=tk.NORMAL)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load file: {str(e)}")
     
+    def close_file(self):
+        """Leave file mode and go back to chunking the text input."""
+        self.source_path = None
+        self.source_size = 0
+        self.source_var.set("")
+        self.close_file_button.config(state=tk.DISABLED)
+        self.input_text.config(state=tk.NORMAL)
+        self.input_text.delete(1.0, tk.END)
+    
     def chunk_data(self):
+        if self.worker is not None:
+            return
         try:
             # Get parameters
             min_size = self.min_size_var.get()
@@ -153,55 +306,146 @@ class RabinChunkerGUI:
             max_size = self.max_size_var.get()
             window_mode = self.window_mode_var.get()
             algorithm = self.algorithm_var.get()
+            norm_level = self.norm_level_var.get()
+            seed = self.seed_var.get()
             
             # Validate
             if min_size >= avg_size or avg_size >= max_size:
                 messagebox.showerror("Error", "Must satisfy: min_size < avg_size < max_size")
                 return
             
-            # Get input data
-            data = self.input_text.get(1.0, tk.END).strip()
-            if not data:
+            # Get input data: the loaded file as raw bytes, or the text exactly as typed
+            if self.source_path:
+                path = self.source_path
+                open_source = lambda: open(path, 'rb')
+                total = self.source_size
+            else:
+                data = self.input_text.get(1.0, 'end-1c').encode('utf-8')
+                open_source = lambda: io.BytesIO(data)
+                total = len(data)
+            if not total:
                 messagebox.showerror("Error", "No input data provided")
                 return
-            
-            # Run selected algorithm(s)
-            if algorithm in ["rabin", "all"]:
-                self.rabin_chunker = RabinChunker(min_size=min_size, avg_size=avg_size, 
-                                           max_size=max_size, window_mode=window_mode)
-                self.rabin_chunks = self.rabin_chunker.chunk_data(data)
-                self.rabin_stats, self.rabin_sizes = self.rabin_chunker.analyze_chunks(self.rabin_chunks)
-            
-            if algorithm in ["gear", "all"]:
-                self.gear_chunker = GearChunker(min_size=min_size, avg_size=avg_size, 
-                                          max_size=max_size)
-                self.gear_chunks = self.gear_chunker.chunk_data(data)
-                self.gear_stats, self.gear_sizes = self.gear_chunker.analyze_chunks(self.gear_chunks)
-            
-            if algorithm in ["fastcdc", "all"]:
-                norm_level = self.norm_level_var.get()
-                self.fastcdc_chunker = fastCDC(min_size=min_size, avg_size=avg_size, 
-                                          max_size=max_size, norm_level=norm_level)
-                self.fastcdc_chunks = self.fastcdc_chunker.chunk_data(data)
-                self.fastcdc_stats, self.fastcdc_sizes = self.fastcdc_chunker.analyze_chunks(self.fastcdc_chunks)
-            
-            # Update UI
-            self.display_statistics()
-            self.display_histogram()
-            self.display_chunks()
-            self.update_chunk_spinbox()
-            
-            msg = []
-            if algorithm in ["rabin", "all"]:
-                msg.append(f"Rabin: {len(self.rabin_chunks)} chunks")
-            if algorithm in ["gear", "all"]:
-                msg.append(f"Gear: {len(self.gear_chunks)} chunks")
-            if algorithm in ["fastcdc", "all"]:
-                msg.append(f"FastCDC: {len(self.fastcdc_chunks)} chunks")
-            messagebox.showinfo("Success", " | ".join(msg))
-            
         except Exception as e:
             messagebox.showerror("Error", f"Chunking failed: {str(e)}")
+            return
+        
+        # Chunkers are built in the worker too, Rabin setup is not free
+        jobs = []
+        if algorithm in ["rabin", "all"]:
+            jobs.append(("rabin", lambda: RabinChunker(min_size=min_size, avg_size=avg_size, 
+                                                       max_size=max_size, window_mode=window_mode)))
+        if algorithm in ["gear", "all"]:
+            jobs.append(("gear", lambda: GearChunker(min_size=min_size, avg_size=avg_size, 
+                                                     max_size=max_size, seed=seed)))
+        if algorithm in ["fastcdc", "all"]:
+            jobs.append(("fastcdc", lambda: fastCDC(min_size=min_size, avg_size=avg_size, 
+                                                    max_size=max_size, norm_level=norm_level,
+                                                    seed=seed, mode='2020')))
+        
+        self.cancel_event = threading.Event()
+        self.results = queue.Queue()
+        # Results of earlier runs are offsets into a source that may no longer be current
+        self.reset_results()
+        self.chunk_list.clear()
+        self.chunk_detail_text.delete(1.0, tk.END)
+        self.chunked_source = open_source
+        self.worker = threading.Thread(target=self.run_chunkers, 
+                                       args=(open_source, total, jobs, self.cancel_event, self.results),
+                                       daemon=True)
+        self.chunk_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_var.set(0)
+        self.status_var.set("Starting...")
+        self.worker.start()
+        self.root.after(100, self.poll_results, self.results)
+    
+    def run_chunkers(self, open_source, total, jobs, cancel, results):
+        """Worker thread: never touches Tk, only posts messages to the results queue."""
+        try:
+            for index, (name, make_chunker) in enumerate(jobs):
+                chunker = make_chunker()
+                # Only end offsets are kept, chunks are read back from the source when shown
+                ends = array('q')
+                
+                def tracked(source):
+                    last_post = 0.0
+                    for chunk in chunker.chunk_stream(source, buffer_size=1 << 18):
+                        if cancel.is_set():
+                            return
+                        ends.append((ends[-1] if ends else 0) + len(chunk))
+                        yield chunk
+                        now = time.monotonic()
+                        if now - last_post > 0.1:
+                            results.put(("progress", name, index, len(jobs), ends[-1], total))
+                            last_post = now
+                
+                with open_source() as source:
+                    stats, hist = chunker.analyze_chunks(tracked(source))
+                if cancel.is_set():
+                    results.put(("cancelled",))
+                    return
+                results.put(("result", name, chunker, np.frombuffer(ends, dtype=np.int64), stats, hist))
+            results.put(("finished", [name for name, _ in jobs]))
+        except Exception as e:
+            results.put(("error", str(e)))
+    
+    def poll_results(self, results):
+        # A cleared run's queue has been replaced, whatever it still posts is dropped
+        if results is not self.results:
+            return
+        labels = {"rabin": "Rabin", "gear": "Gear", "fastcdc": "FastCDC"}
+        try:
+            while True:
+                message = results.get_nowait()
+                kind = message[0]
+                
+                if kind == "progress":
+                    _, name, index, count, done, total = message
+                    fraction = done / total if total else 1.0
+                    self.progress_var.set((index + fraction) / count * 100)
+                    self.status_var.set(f"{labels[name]}: {fraction*100:.0f}%")
+                
+                elif kind == "result":
+                    # Show each algorithm as soon as it is done
+                    _, name, chunker, ends, stats, hist = message
+                    setattr(self, f"{name}_chunker", chunker)
+                    setattr(self, f"{name}_ends", ends)
+                    setattr(self, f"{name}_stats", stats)
+                    setattr(self, f"{name}_hist", hist)
+                    self.display_statistics()
+                    self.display_histogram()
+                    self.display_chunks()
+                    self.update_chunk_spinbox()
+                
+                elif kind == "finished":
+                    self.finish_chunking("Done", 100)
+                    msg = [f"{labels[name]}: {len(getattr(self, f'{name}_ends')):,} chunks" for name in message[1]]
+                    messagebox.showinfo("Success", " | ".join(msg))
+                    return
+                
+                elif kind == "cancelled":
+                    self.finish_chunking("Cancelled", 0)
+                    return
+                
+                elif kind == "error":
+                    self.finish_chunking("Failed", 0)
+                    messagebox.showerror("Error", f"Chunking failed: {message[1]}")
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self.poll_results, results)
+    
+    def finish_chunking(self, status, progress):
+        self.worker = None
+        self.chunk_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.progress_var.set(progress)
+        self.status_var.set(status)
+    
+    def cancel_chunking(self):
+        self.cancel_event.set()
+        self.status_var.set("Cancelling...")
     
     def display_statistics(self):
         self.stats_text.delete(1.0, tk.END)
@@ -215,7 +459,8 @@ RABIN FINGERPRINTING STATISTICS
 {'='*50}
 
 📊 Configuration:
-   Window Size:      {self.rabin_stats['window_size']} bytes ({self.rabin_stats['window_size']*8} bits)
+   Window Size:      {self.rabin_stats['window_size']} bytes
+   Poly Degree:      {self.rabin_chunker.rabin.degree} bits
    Target Avg Size:  {self.rabin_stats['target_avg']:,} bytes
    Min/Max Bounds:   {self.rabin_chunker.min_size:,} / {self.rabin_chunker.max_size:,} bytes
    Mask:             0x{self.rabin_chunker.mask:X}
@@ -245,8 +490,7 @@ RABIN FINGERPRINTING STATISTICS
             output += f"   Space Savings:    {savings:.1f}%\n"
             
             # Size distribution
-            bins = [self.rabin_chunker.min_size, self.rabin_stats['target_avg'], self.rabin_chunker.max_size]
-            hist, _ = np.histogram(self.rabin_sizes, bins=bins)
+            hist = self.rabin_stats['size_distribution']
             
             output += f"\n📉 Size Distribution:\n"
             output += f"   < {self.rabin_stats['target_avg']:,} bytes:  {hist[0]:3d} chunks ({hist[0]/self.rabin_stats['num_chunks']*100:.1f}%)\n"
@@ -290,8 +534,7 @@ GEAR HASHING STATISTICS
             output += f"   Space Savings:    {savings:.1f}%\n"
             
             # Size distribution
-            bins = [self.gear_chunker.min_size, self.gear_stats['target_avg'], self.gear_chunker.max_size]
-            hist, _ = np.histogram(self.gear_sizes, bins=bins)
+            hist = self.gear_stats['size_distribution']
             
             output += f"\n📉 Size Distribution:\n"
             output += f"   < {self.gear_stats['target_avg']:,} bytes:  {hist[0]:3d} chunks ({hist[0]/self.gear_stats['num_chunks']*100:.1f}%)\n"
@@ -340,8 +583,7 @@ FASTCDC STATISTICS
             output += f"   Space Savings:    {savings:.1f}%\n"
             
             # Size distribution
-            bins = [self.fastcdc_chunker.min_size, self.fastcdc_stats['target_avg'], self.fastcdc_chunker.max_size]
-            hist, _ = np.histogram(self.fastcdc_sizes, bins=bins)
+            hist = self.fastcdc_stats['size_distribution']
             
             output += f"\n📉 Size Distribution:\n"
             output += f"   < {self.fastcdc_stats['target_avg']:,} bytes:  {hist[0]:3d} chunks ({hist[0]/self.fastcdc_stats['num_chunks']*100:.1f}%)\n"
@@ -386,34 +628,31 @@ ALGORITHM COMPARISON
         self.stats_text.insert(1.0, output)
     
     def display_histogram(self):
-        # Clear previous plot
-        for widget in self.hist_frame.winfo_children():
-            widget.destroy()
-        
-        # Create new plot
-        fig = Figure(figsize=(8, 6), dpi=100)
-        ax = fig.add_subplot(111)
+        # Histograms come pre-binned from the chunkers, so redrawing is cheap
+        # whatever the chunk count; the figure is reused between runs
+        ax = self.hist_ax
+        ax.clear()
         
         # Plot histogram(s) based on what data is available
-        num_algos = sum([bool(self.rabin_sizes), bool(self.gear_sizes), bool(self.fastcdc_sizes)])
+        num_algos = sum([self.rabin_hist is not None, self.gear_hist is not None, self.fastcdc_hist is not None])
         
         if num_algos > 1:
             # Multiple algorithms - overlapping histograms
-            if self.rabin_sizes:
-                ax.hist(self.rabin_sizes, bins=20, color='skyblue', edgecolor='blue', 
-                       alpha=0.5, label='Rabin')
+            if self.rabin_hist is not None:
+                ax.stairs(*self.rabin_hist, fill=True, facecolor='skyblue', edgecolor='blue', 
+                          alpha=0.5, label='Rabin')
                 ax.axvline(self.rabin_stats['avg_chunk'], color='blue', linestyle='--', 
                           linewidth=2, label=f'Rabin Avg: {self.rabin_stats["avg_chunk"]:.0f}')
             
-            if self.gear_sizes:
-                ax.hist(self.gear_sizes, bins=20, color='lightcoral', edgecolor='red', 
-                       alpha=0.5, label='Gear')
+            if self.gear_hist is not None:
+                ax.stairs(*self.gear_hist, fill=True, facecolor='lightcoral', edgecolor='red', 
+                          alpha=0.5, label='Gear')
                 ax.axvline(self.gear_stats['avg_chunk'], color='red', linestyle='--', 
                           linewidth=2, label=f'Gear Avg: {self.gear_stats["avg_chunk"]:.0f}')
             
-            if self.fastcdc_sizes:
-                ax.hist(self.fastcdc_sizes, bins=20, color='lightgreen', edgecolor='green', 
-                       alpha=0.5, label='FastCDC')
+            if self.fastcdc_hist is not None:
+                ax.stairs(*self.fastcdc_hist, fill=True, facecolor='lightgreen', edgecolor='green', 
+                          alpha=0.5, label='FastCDC')
                 ax.axvline(self.fastcdc_stats['avg_chunk'], color='green', linestyle='--', 
                           linewidth=2, label=f'FastCDC Avg: {self.fastcdc_stats["avg_chunk"]:.0f}')
             
@@ -422,23 +661,23 @@ ALGORITHM COMPARISON
             if target:
                 ax.axvline(target, color='black', linestyle=':', 
                           linewidth=2, label=f'Target: {target}')
-        elif self.rabin_sizes:
+        elif self.rabin_hist is not None:
             # Only Rabin
-            ax.hist(self.rabin_sizes, bins=20, color='skyblue', edgecolor='black', alpha=0.7)
+            ax.stairs(*self.rabin_hist, fill=True, facecolor='skyblue', edgecolor='black', alpha=0.7)
             ax.axvline(self.rabin_stats['avg_chunk'], color='red', linestyle='--', 
                       linewidth=2, label=f'Actual Avg: {self.rabin_stats["avg_chunk"]:.0f}')
             ax.axvline(self.rabin_stats['target_avg'], color='green', linestyle='--', 
                       linewidth=2, label=f'Target Avg: {self.rabin_stats["target_avg"]}')
-        elif self.gear_sizes:
+        elif self.gear_hist is not None:
             # Only Gear
-            ax.hist(self.gear_sizes, bins=20, color='lightcoral', edgecolor='black', alpha=0.7)
+            ax.stairs(*self.gear_hist, fill=True, facecolor='lightcoral', edgecolor='black', alpha=0.7)
             ax.axvline(self.gear_stats['avg_chunk'], color='red', linestyle='--', 
                       linewidth=2, label=f'Actual Avg: {self.gear_stats["avg_chunk"]:.0f}')
             ax.axvline(self.gear_stats['target_avg'], color='green', linestyle='--', 
                       linewidth=2, label=f'Target Avg: {self.gear_stats["target_avg"]}')
-        elif self.fastcdc_sizes:
+        elif self.fastcdc_hist is not None:
             # Only FastCDC
-            ax.hist(self.fastcdc_sizes, bins=20, color='lightgreen', edgecolor='black', alpha=0.7)
+            ax.stairs(*self.fastcdc_hist, fill=True, facecolor='lightgreen', edgecolor='black', alpha=0.7)
             ax.axvline(self.fastcdc_stats['avg_chunk'], color='red', linestyle='--', 
                       linewidth=2, label=f'Actual Avg: {self.fastcdc_stats["avg_chunk"]:.0f}')
             ax.axvline(self.fastcdc_stats['target_avg'], color='green', linestyle='--', 
@@ -449,96 +688,93 @@ ALGORITHM COMPARISON
         ax.set_title('Chunk Size Distribution')
         ax.legend()
         ax.grid(True, alpha=0.3)
-        
-        # Embed plot
-        canvas = FigureCanvasTkAgg(fig, master=self.hist_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.hist_canvas.draw_idle()
+    
+    def shown_chunks(self):
+        """(label, end offsets) of the algorithm shown in the preview: rabin, then gear, then fastcdc."""
+        for name, label in (("rabin", "Rabin"), ("gear", "Gear"), ("fastcdc", "FastCDC")):
+            ends = getattr(self, f"{name}_ends")
+            if ends is not None and len(ends):
+                return label, ends
+        return None, None
+    
+    def read_chunk(self, ends, idx, limit=None):
+        """Offset, size and (up to limit) content of chunk idx, read from the chunked source."""
+        start = int(ends[idx - 1]) if idx else 0
+        size = int(ends[idx]) - start
+        with self.chunked_source() as source:
+            source.seek(start)
+            return start, size, source.read(size if limit is None else min(size, limit))
     
     def display_chunks(self):
-        self.chunks_text.delete(1.0, tk.END)
-        
-        # Use whichever chunks are available (prefer rabin, then gear, then fastcdc)
-        if self.rabin_chunks:
-            chunks = self.rabin_chunks
-            algo = "Rabin"
-        elif self.gear_chunks:
-            chunks = self.gear_chunks
-            algo = "Gear"
-        elif self.fastcdc_chunks:
-            chunks = self.fastcdc_chunks
-            algo = "FastCDC"
-        else:
+        algo, ends = self.shown_chunks()
+        if ends is None:
+            self.chunk_list.clear()
             return
-        
-        output = f"📦 Chunk Preview - {algo} ({len(chunks)} total chunks):\n"
-        output += "-" * 70 + "\n\n"
-        
-        max_display = min(20, len(chunks))
-        for i, chunk in enumerate(chunks[:max_display]):
-            try:
-                preview = chunk.decode('utf-8', errors='replace')
-                if len(preview) > 60:
-                    preview = preview[:60] + "..."
-                preview = preview.replace('\n', '\\n')
-            except:
-                preview = f"<binary data: {len(chunk)} bytes>"
-            
-            output += f"Chunk {i:3d} | Size: {len(chunk):5d} bytes\n"
-            output += f"         | {preview}\n\n"
-        
-        if len(chunks) > max_display:
-            output += f"... and {len(chunks) - max_display} more chunks\n"
-        
-        self.chunks_text.insert(1.0, output)
+        self.chunk_list.set_chunks(algo, ends, self.chunked_source)
     
     def update_chunk_spinbox(self):
-        if self.rabin_chunks:
-            self.chunk_spinbox.config(to=len(self.rabin_chunks)-1)
-        elif self.gear_chunks:
-            self.chunk_spinbox.config(to=len(self.gear_chunks)-1)
-        elif self.fastcdc_chunks:
-            self.chunk_spinbox.config(to=len(self.fastcdc_chunks)-1)
+        _, ends = self.shown_chunks()
+        if ends is not None:
+            self.chunk_spinbox.config(to=len(ends)-1)
+    
+    def select_chunk(self, idx):
+        self.chunk_index_var.set(idx)
+        self.show_chunk_detail()
     
     def show_chunk_detail(self):
-        if not self.rabin_chunks and not self.gear_chunks and not self.fastcdc_chunks:
+        _, ends = self.shown_chunks()
+        if ends is None:
             return
         
         idx = self.chunk_index_var.get()
-        chunks = self.rabin_chunks if self.rabin_chunks else (self.gear_chunks if self.gear_chunks else self.fastcdc_chunks)
-        
-        if 0 <= idx < len(chunks):
-            chunk = chunks[idx]
-            try:
-                content = chunk.decode('utf-8', errors='replace')
-            except:
-                content = f"<binary data>"
+        if 0 <= idx < len(ends):
+            start, size, chunk = self.read_chunk(ends, idx, self.DETAIL_SIZE)
+            content = chunk.decode('utf-8', errors='replace')
+            if size > len(chunk):
+                content += f"\n... first {len(chunk):,} of {size:,} bytes shown ..."
             
             self.chunk_detail_text.delete(1.0, tk.END)
             detail = f"Chunk {idx} Details:\n"
-            detail += f"Size: {len(chunk)} bytes\n"
+            detail += f"Offset: {start:,}\n"
+            detail += f"Size: {size} bytes\n"
             detail += f"Content:\n{'-'*70}\n{content}\n"
             self.chunk_detail_text.insert(1.0, detail)
     
     def clear_results(self):
+        # Stop a run in progress and end it here: a fresh queue makes
+        # poll_results drop the messages it still has in flight
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.results = queue.Queue()
+            self.finish_chunking("Cancelled", 0)
+        
         # Clear text displays
         self.stats_text.delete(1.0, tk.END)
-        self.chunks_text.delete(1.0, tk.END)
+        self.chunk_list.clear()
         self.chunk_detail_text.delete(1.0, tk.END)
         
         # Clear histogram
-        for widget in self.hist_frame.winfo_children():
-            widget.destroy()
+        self.hist_ax.clear()
+        self.hist_canvas.draw_idle()
         
+        self.reset_results()
+        
+        # Reset chunk spinbox
+        self.chunk_spinbox.config(to=0)
+        self.chunk_index_var.set(0)
+    
+    def reset_results(self):
         # Reset all chunker objects and data
         self.rabin_chunker = None
         self.gear_chunker = None
         self.fastcdc_chunker = None
         
-        # Clear all chunks
-        self.rabin_chunks = []
-        self.gear_chunks = []
-        self.fastcdc_chunks = []
+        # Clear all chunk offsets
+        self.rabin_ends = None
+        self.gear_ends = None
+        self.fastcdc_ends = None
+        self.chunked_source = None
         
         # Clear all statistics
         self.rabin_stats = {}
@@ -546,13 +782,9 @@ ALGORITHM COMPARISON
         self.fastcdc_stats = {}
         
         # Clear all sizes
-        self.rabin_sizes = []
-        self.gear_sizes = []
-        self.fastcdc_sizes = []
-        
-        # Reset chunk spinbox
-        self.chunk_spinbox.config(to=0)
-        self.chunk_index_var.set(0)
+        self.rabin_hist = None
+        self.gear_hist = None
+        self.fastcdc_hist = None
 
 def main():
     root = tk.Tk()
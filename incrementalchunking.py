@@ -0,0 +1,114 @@
+import numpy as np
+from chunkio import as_buffer
+
+
+def scan_cuts(chunker, data, pos, hi):
+    """Cut points in data[pos:hi] for a chunk starting at the confirmed boundary pos.
+
+    hi is only kept as a cut when it is the end of data. Chunkers with
+    find_candidates/next_cut get the bytes before pos as hash history, so a
+    rolling window that is not reset at cuts (Rabin) sees the same input as
+    in a full run.
+    """
+    if hasattr(chunker, 'find_candidates'):
+        segment = data[pos:hi]
+        candidates = chunker.find_candidates(segment, data[max(0, pos - chunker.window_size + 1):pos])
+        cuts = []
+        start = 0
+        while True:
+            end = chunker.next_cut(segment, candidates, start)
+            if end is None:
+                break
+            cuts.append(pos + end)
+            start = end
+        if hi == len(data) and start < len(segment):
+            cuts.append(hi)
+        return cuts
+
+    cuts = [pos + c for c in chunker.find_boundaries(data[pos:hi])]
+    if cuts and hi < len(data) and cuts[-1] == hi:
+        cuts.pop()
+    return cuts
+
+
+def rechunk(chunker, data, boundaries, edits):
+    """Chunk end offsets of edited data, reusing the boundaries of the data before the edits.
+
+    boundaries: end offsets of the old data, as returned by find_boundaries
+    edits: (offset, removed, inserted) in old-data coordinates, sorted and
+    not overlapping: removed bytes at offset were replaced by inserted new
+    ones (0 removed is an insert, 0 inserted a delete, an append is
+    (old length, 0, appended)).
+
+    Boundaries before each edit are kept. The chunker is re-run from the
+    last boundary before the edit until one of its cuts past the edit lands
+    on an old boundary (shifted by the size change) that the edited bytes
+    can no longer influence; the old boundaries are then reused up to the
+    next edit. The result equals
+    chunker.find_boundaries(data), at a cost of roughly the edited bytes
+    plus a few chunks per edit.
+    """
+    data = as_buffer(data)
+    old = np.asarray(boundaries, dtype=np.int64)
+    old_size = int(old[-1]) if len(old) else 0
+    edits = sorted((int(o), int(r), int(i)) for o, r, i in edits)
+
+    end = 0
+    for offset, removed, inserted in edits:
+        if offset < end or removed < 0 or inserted < 0 or offset + removed > old_size:
+            raise ValueError(f"Edits must be sorted, non-overlapping and inside the old data: {(offset, removed, inserted)}")
+        end = offset + removed
+    if old_size + sum(i - r for _, r, i in edits) != len(data):
+        raise ValueError(f"Edits change {old_size} bytes into {old_size + sum(i - r for _, r, i in edits)}, "
+                         f"but data has {len(data)}")
+
+    # The last old boundary is just where the old data stopped, not a cut
+    cuts = old[:-1]
+    known = set(cuts.tolist())
+    chunk_limit = max(chunker.min_size, chunker.avg_size, chunker.max_size) + 1
+    span = 4 * chunk_limit
+
+    result = []
+    shift = 0
+    k = 0
+    while k < len(edits):
+        offset, removed, inserted = edits[k]
+        # old cuts up to the edit are unaffected by it
+        last = result[-1] if result else 0
+        kept = cuts[np.searchsorted(cuts, last - shift, side='right'):np.searchsorted(cuts, offset, side='right')]
+        result.extend((kept + shift).tolist())
+
+        pos = result[-1] if result else 0
+        edited_end = offset + shift + inserted
+        shift += inserted - removed
+        k += 1
+
+        # a window that keeps rolling across cuts still sees edited bytes
+        # window_size - 1 bytes after the edit
+        settle = 0 if chunker.resets_hash else chunker.window_size - 1
+        synced = False
+        while pos < len(data) and not synced:
+            hi = min(len(data), pos + span)
+            found = scan_cuts(chunker, data, pos, hi)
+            for cut in found:
+                # a cut past the start of the next edit means that edit is re-chunked here too
+                while k < len(edits) and cut > edits[k][0] + shift:
+                    offset, removed, inserted = edits[k]
+                    edited_end = offset + shift + inserted
+                    shift += inserted - removed
+                    k += 1
+                result.append(cut)
+                if cut >= edited_end + settle and cut < len(data) and cut - shift in known:
+                    synced = True
+                    break
+            if not found:
+                break
+            pos = result[-1]
+
+    # old cuts after the last edit, then the end of data
+    last = result[-1] if result else 0
+    kept = cuts[np.searchsorted(cuts, last - shift, side='right'):]
+    result.extend((kept + shift).tolist())
+    if (result[-1] if result else 0) < len(data):
+        result.append(len(data))
+    return result
@@ -0,0 +1,101 @@
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from chunkio import as_buffer
+
+
+def segment_boundaries(chunker, shm_name, start, end, final):
+    """Cut points of data[start:end] in shared memory, chunked as if a chunk began at start.
+
+    The trailing end offset is only kept for the last segment; elsewhere it
+    is just where the segment stops, not a cut.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        segment = shm.buf[start:end]
+        cuts = chunker.find_boundaries(segment)
+        segment.release()
+    finally:
+        shm.close()
+    if cuts and not final and cuts[-1] == end - start:
+        cuts = cuts[:-1]
+    return np.asarray(cuts, dtype=np.int64) + start
+
+
+def resync(chunker, data, pos, limit, targets, span):
+    """Re-chunk from the confirmed boundary pos until a cut lands on one of targets.
+
+    Returns the confirmed cuts found on the way (ending with the sync point
+    if there was one) and whether the cut points resynchronized before limit.
+    """
+    confirmed = []
+    while pos < limit:
+        hi = min(limit, pos + span)
+        cuts = [pos + c for c in chunker.find_boundaries(data[pos:hi])]
+        if cuts and hi < len(data) and cuts[-1] == hi:
+            cuts.pop()
+        for cut in cuts:
+            confirmed.append(cut)
+            if cut in targets:
+                return confirmed, True
+        if not cuts or hi == limit:
+            break
+        pos = cuts[-1]
+    return confirmed, False
+
+
+def parallel_boundaries(chunker, data, workers=None, segment_size=None):
+    """Chunk end offsets of data using a process pool, identical to chunker.find_boundaries.
+
+    data is copied once into shared memory and split into segments; each
+    worker chunks its segment from the segment start. The segments are then
+    stitched by re-running the chunker from the last confirmed boundary
+    before each split until its cut points line up with the worker's again,
+    which normally takes a few chunks. With chunker.metrics set, the run is
+    recorded once as a whole, as a 'parallel' phase.
+    """
+    metrics = getattr(chunker, 'metrics', None)
+    if metrics is not None:
+        # workers and the stitching pass run on a copy so their calls are not recorded one by one
+        original = chunker
+        chunker = copy.copy(chunker)
+        chunker.metrics = None
+        started = time.perf_counter()
+        boundaries = parallel_boundaries(chunker, data, workers, segment_size)
+        metrics.record(original, len(as_buffer(data)), boundaries, {'parallel': time.perf_counter() - started})
+        return boundaries
+
+    data = as_buffer(data)
+    workers = workers or os.cpu_count() or 1
+    chunk_limit = max(chunker.min_size, chunker.avg_size, chunker.max_size) + 1
+    span = 4 * chunk_limit
+    if segment_size is None:
+        segment_size = -(-len(data) // workers)
+    segment_size = max(segment_size, 16 * chunk_limit)
+    if workers == 1 or len(data) <= segment_size:
+        return chunker.find_boundaries(data)
+
+    splits = list(range(0, len(data), segment_size)) + [len(data)]
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        shm.buf[:len(data)] = data
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(segment_boundaries, chunker, shm.name, lo, hi, hi == len(data))
+                       for lo, hi in zip(splits[:-1], splits[1:])]
+            segments = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    boundaries = segments[0].tolist()
+    for k in range(1, len(segments)):
+        pos = boundaries[-1] if boundaries else 0
+        targets = segments[k]
+        confirmed, synced = resync(chunker, data, pos, splits[k + 1], set(targets.tolist()), span)
+        boundaries.extend(confirmed)
+        if synced:
+            boundaries.extend(targets[np.searchsorted(targets, confirmed[-1], side='right'):].tolist())
+    return boundaries
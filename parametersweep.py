@@ -0,0 +1,168 @@
+"""Evaluate many GearChunker/fastCDC parameter sets over one corpus.
+
+Past its first 63 bytes the 64-bit gear hash only depends on the last 64
+bytes, not on where the current chunk started, so the hash stream of the
+corpus is computed once and every distinct mask is matched against it in
+bulk. Each parameter set then only walks its own candidate positions,
+which gives exactly the boundaries the chunkers themselves would find.
+
+    python3 parametersweep.py data --avg 4096,8192,16384 --norm-levels 1,2,3
+"""
+import argparse
+import itertools
+import json
+import mmap
+import os
+import numpy as np
+from chunkio import as_buffer
+from chunkstats import ChunkStats
+from fastCDC import fastCDC
+from gearhashing import DEFAULT_SEED, GearChunker, GearHashing
+
+
+def make_cases(algorithms, min_sizes, avg_sizes, max_sizes, norm_levels=(3,)):
+    """(algorithm, params) for every valid min_size < avg_size < max_size combination."""
+    cases = []
+    for min_size, avg_size, max_size in itertools.product(min_sizes, avg_sizes, max_sizes):
+        if not min_size < avg_size < max_size:
+            continue
+        params = {'min_size': min_size, 'avg_size': avg_size, 'max_size': max_size}
+        if 'gear' in algorithms:
+            cases.append(('gear', dict(params)))
+        if 'fastcdc' in algorithms:
+            for norm_level in norm_levels:
+                cases.append(('fastcdc', dict(params, norm_level=norm_level)))
+    return cases
+
+
+def case_masks(chunker):
+    """(mask, value) pairs a chunker cuts on: hash & mask == value."""
+    if isinstance(chunker, GearChunker):
+        return [(chunker.mask, 0)]
+    return [(chunker.large_mask, chunker.large_mask), (chunker.small_mask, chunker.small_mask)]
+
+
+def find_candidates(data, masks, gear, block_size=1 << 20):
+    """Positions of data whose full-window gear hash matches each (mask, value), one hash pass."""
+    found = {key: [] for key in masks}
+    window = gear.window_size
+    for offset in range(0, len(data), block_size):
+        hashes = gear.hash_block(data[offset:offset + block_size], data[max(0, offset - window + 1):offset])
+        for mask, value in masks:
+            found[mask, value].append(np.flatnonzero((hashes & np.uint64(mask)) == np.uint64(value)) + offset)
+    return {key: np.concatenate(parts) if parts else np.empty(0, dtype=np.int64) for key, parts in found.items()}
+
+
+def fastcdc_cut(chunker, data, large, small, start):
+    """End offset of the fastCDC chunk starting at start, from precomputed candidates.
+
+    Same regions as fastCDC.find_boundaries_2020; None if data runs out first.
+    """
+    n = len(data)
+    first = start + chunker.normalized_size
+    emergency = start + max(chunker.avg_size, chunker.normalized_size)
+    forced = start + max(chunker.max_size, chunker.avg_size, chunker.normalized_size)
+    warm = start + chunker.hash_lenght - 1
+
+    # Right after a reset the hash covers fewer than 64 bytes, check those directly
+    if first < warm:
+        h = 0
+        for i in range(start, min(warm, n)):
+            h = ((h << 1) + chunker.gear_table[data[i]]) & 0xFFFFFFFFFFFFFFFF
+            if i >= first:
+                mask = chunker.large_mask if i < emergency else chunker.small_mask
+                if (h & mask) == mask or i >= forced:
+                    return i + 1
+        first = warm
+
+    k = np.searchsorted(large, first)
+    if k < len(large) and large[k] < emergency:
+        return int(large[k]) + 1
+    k = np.searchsorted(small, max(first, emergency))
+    if k < len(small) and small[k] < forced:
+        return int(small[k]) + 1
+    if forced < n:
+        return forced + 1
+    return None
+
+
+def sweep(data, cases, seed=DEFAULT_SEED, gear_table=None, block_size=1 << 20):
+    """Chunk counts, size statistics, histograms and dedup ratios for every case.
+
+    cases is a list of (algorithm, params) as returned by make_cases. All
+    cases share one gear table, so seed/gear_table apply to all of them.
+    """
+    data = as_buffer(data)
+    gear = GearHashing(window_size=64, seed=seed, gear_table=gear_table)
+    chunkers = []
+    for algorithm, params in cases:
+        if algorithm == 'gear':
+            chunkers.append(GearChunker(gear_table=gear.gear_table, **params))
+        elif algorithm == 'fastcdc':
+            chunkers.append(fastCDC(gear_table=gear.gear_table, **params))
+        else:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+
+    masks = sorted({key for chunker in chunkers for key in case_masks(chunker)})
+    candidates = find_candidates(data, masks, gear, block_size)
+
+    results = []
+    for (algorithm, params), chunker in zip(cases, chunkers):
+        stats = ChunkStats(chunker.min_size, chunker.avg_size, chunker.max_size)
+        found = [candidates[key] for key in case_masks(chunker)]
+        start = 0
+        while start < len(data):
+            if algorithm == 'gear':
+                end = chunker.next_cut(data, found[0], start)
+            else:
+                end = fastcdc_cut(chunker, data, found[0], found[1], start)
+            if end is None:
+                end = len(data)
+            stats.update(data[start:end])
+            start = end
+        counts, edges = stats.histogram()
+        results.append({'algorithm': algorithm, **params, **stats.result(),
+                        'histogram': counts.tolist(), 'histogram_edges': edges.tolist()})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep GearChunker/fastCDC parameters over one file")
+    parser.add_argument('path', help="corpus file")
+    parser.add_argument('--algorithms', default='gear,fastcdc', help="comma separated list")
+    parser.add_argument('--min', default='1024,2048,4096', help="comma separated min sizes")
+    parser.add_argument('--avg', default='4096,8192,16384', help="comma separated average sizes")
+    parser.add_argument('--max', default='16384,32768,65536', help="comma separated max sizes")
+    parser.add_argument('--norm-levels', default='1,2,3', help="comma separated fastCDC norm levels")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="gear table seed")
+    parser.add_argument('--output', default='sweep.json', help="JSON results file")
+    args = parser.parse_args(argv)
+
+    sizes = lambda text: [int(value) for value in text.split(',')]
+    cases = make_cases(args.algorithms.split(','), sizes(args.min), sizes(args.avg), sizes(args.max),
+                       sizes(args.norm_levels))
+
+    with open(args.path, 'rb') as f:
+        # an empty file cannot be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            results = sweep(b'', cases, seed=args.seed)
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    results = sweep(view, cases, seed=args.seed)
+                finally:
+                    view.release()
+
+    for result in results:
+        norm = f"norm {result['norm_level']}" if 'norm_level' in result else ""
+        print(f"{result['algorithm']:8s} {result['min_size']:>7d} {result['avg_size']:>7d} {result['max_size']:>7d} "
+              f"{norm:7s} {result['num_chunks']:>9d} chunks  avg {result['avg_chunk']:9.1f}  "
+              f"std {result['std_dev']:9.1f}  dedup {result['dedup_rate']:.3f}x")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,104 +1,327 @@
+import hashlib
+import itertools
+import json
+import os
 import numpy as np
-import galois as g
 import logging 
+from chunkio import as_buffer, block_candidates, chunk_file, split_chunks, stream_chunks, walk_boundaries
+from chunkmetrics import size_limit_profile
+from chunkstats import ChunkStats
+from gearhashing import DEFAULT_SEED
+from incrementalchunking import rechunk
+
+CACHE_DIR = os.environ.get('CDC_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'cdc'))
+POLY_CACHE = os.path.join(CACHE_DIR, 'rabin_polys.json')
+
+# (poly, degree, window_size) -> (shift_table, window_tables, pop_table), shared by all fingerprints
+_tables = {}
+# contents of POLY_CACHE, read once per process and refreshed on a miss
+_poly_cache = None
+# polynomials known to be irreducible in this process
+_verified = set()
+
+
+def is_irreducible(poly):
+    # galois is slow to import and only needed to vet new polynomials
+    import galois as g
+    return g.Poly.Int(poly).is_irreducible()
+
+
+def _load_poly_cache():
+    try:
+        with open(POLY_CACHE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_poly_cache(cache):
+    # best effort, a read-only home only means the search runs again next time
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{POLY_CACHE}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=0, sort_keys=True)
+        os.replace(tmp, POLY_CACHE)
+    except OSError as e:
+        logging.info(f"Could not write polynomial cache {POLY_CACHE}: {e}")
+
+
+def _cached_polys(refresh=False):
+    global _poly_cache
+    if _poly_cache is None or refresh:
+        _poly_cache = _load_poly_cache()
+    return _poly_cache
+
+
+def check_irreducible_poly(poly, degree):
+    """True if poly (int) is an irreducible polynomial of the given degree.
+
+    Polynomials from the cache or already checked in this process are
+    accepted without importing galois; newly checked ones are cached.
+    """
+    if poly.bit_length() - 1 != degree:
+        return False
+    if poly in _verified or f"{poly:x}" in _cached_polys().values():
+        _verified.add(poly)
+        return True
+    if not is_irreducible(poly):
+        return False
+    _verified.add(poly)
+    cache = _cached_polys(refresh=True)
+    cache[f"poly:{poly:x}"] = f"{poly:x}"
+    _save_poly_cache(cache)
+    return True
+
+
+def make_irreducible_poly(degree, seed=DEFAULT_SEED):
+    """Irreducible GF(2) polynomial of the given degree (as int) derived from seed.
+
+    Candidates are drawn with BLAKE2b, so a seed gives the same polynomial on
+    every host. Results are kept in a JSON cache under CACHE_DIR, so galois
+    is only imported the first time a (seed, degree) pair is used; within a
+    process the cache file is only read again on a miss.
+    seed=None draws a random polynomial instead, which is never cached.
+    """
+    if seed is None:
+        import galois as g
+        return int(g.irreducible_poly(2, degree, None, "random"))
+
+    key = f"{seed}:{degree}"
+    cache = _cached_polys()
+    if key not in cache:
+        # another process may have found it since the cache was read
+        cache = _cached_polys(refresh=True)
+    if key in cache:
+        return int(cache[key], 16)
+
+    for counter in itertools.count():
+        digest = hashlib.blake2b(f"{seed}:{degree}:{counter}".encode('utf-8'), digest_size=8).digest()
+        poly = (int.from_bytes(digest, 'big') & ((1 << degree) - 1)) | (1 << degree) | 1
+        if is_irreducible(poly):
+            break
+    logging.info(f"Found irreducible polynomial of degree {degree} for seed {seed}: 0x{poly:x}")
+    _verified.add(poly)
+    cache[key] = f"{poly:x}"
+    _save_poly_cache(cache)
+    return poly
+
 
 class RabinFingerprint: 
-    def __init__(self, window_size=64):
-        self.degree = window_size
-        self.poly = g.irreducible_poly(2,self.degree,None,"random")
-        self.poly_field = g.GF(2**self.degree, irreducible_poly=self.poly)
-        logging.info(f"Generated random irreducible polynomial: {self.poly}")
-        self.fingerprint = self.poly_field(0)   
-        
-
-    def compute_fingerprint(self, data: str):    
-        data = data.encode('utf-8') 
-        fingerprint = self.poly_field(0)
+    def __init__(self, window_size=48, degree=53, poly=None, seed=DEFAULT_SEED):
+        '''
+        window_size in bytes, degree of the irreducible polynomial in bits
+        poly fixes the polynomial (int or galois Poly) and overrides seed,
+        otherwise it comes from make_irreducible_poly(degree, seed)
+        '''
+        if not 8 <= degree <= 56:
+            raise ValueError("degree must be between 8 and 56 bits")
+
+        self.window_size = window_size
+        self.degree = degree
+        self.seed = seed
+        if poly is not None:
+            poly = int(poly)
+            if not check_irreducible_poly(poly, degree):
+                raise ValueError(f"0x{poly:x} is not an irreducible polynomial of degree {degree}")
+            self.poly_int = poly
+        else:
+            self.poly_int = make_irreducible_poly(degree, seed)
+
+        # shift_table[t] reduces the byte t pushed above the degree by a shift,
+        # window_tables[j][b] is byte b seen j positions back in the window
+        key = (self.poly_int, degree, window_size)
+        if key not in _tables:
+            _tables[key] = self.build_tables()
+        self.shift_table, self.window_tables, self.pop_table = _tables[key]
+        self.fingerprint = 0
+
+    def build_tables(self):
+        shift_table = [self.poly_mod(t << self.degree) for t in range(256)]
+        # each row is the previous one shifted by a byte and reduced with shift_table
+        shift = np.array(shift_table, dtype=np.uint64)
+        low = np.uint64((1 << (self.degree - 8)) - 1)
+        top = np.uint64(self.degree - 8)
+        window_tables = np.empty((self.window_size, 256), dtype=np.uint64)
+        window_tables[0] = np.arange(256, dtype=np.uint64)
+        for j in range(1, self.window_size):
+            prev = window_tables[j - 1]
+            window_tables[j] = ((prev & low) << np.uint64(8)) ^ shift[(prev >> top).astype(np.intp)]
+        window_tables.flags.writeable = False
+        pop_table = [int(v) for v in window_tables[-1]]
+        return shift_table, window_tables, pop_table
+
+    def poly_mod(self, value: int):
+        """Reduce a GF(2) polynomial (as int) modulo the irreducible polynomial."""
+        while value.bit_length() > self.degree:
+            value ^= self.poly_int << (value.bit_length() - 1 - self.degree)
+        return value
+
+    def compute_fingerprint(self, data: str):
+        data = data.encode('utf-8')
+        self.reset_fingerprint()
         for byte in data:
-            fingerprint = fingerprint* self.poly_field(256) # shift byte 
-            fingerprint = fingerprint + self.poly_field(byte)
-        self.fingerprint = fingerprint                  
-    
+            self.fingerprint_expand(byte)
+
         return (self.fingerprint)
 
     def fingerprint_expand(self, new_byte: int):
-        self.fingerprint = self.fingerprint * self.poly_field(256) + self.poly_field(new_byte)
-        return (self.fingerprint)    
-    
+        top = self.fingerprint >> (self.degree - 8)
+        self.fingerprint = (((self.fingerprint << 8) | new_byte) & ((1 << self.degree) - 1)) ^ self.shift_table[top]
+        return (self.fingerprint)
+
     def fingerprint_roll(self, old_byte: int, new_byte: int):
-        self.fingerprint = self.fingerprint - self.poly_field(old_byte )* self.poly_field((2 ** (self.degree -8)))
-        self.fingerprint = self.fingerprint * self.poly_field(256)
-        self.fingerprint = self.fingerprint + self.poly_field(new_byte)    
-        return (self.fingerprint)    
-    
+        self.fingerprint ^= self.pop_table[old_byte]
+        return self.fingerprint_expand(new_byte)
+
     def reset_fingerprint(self):
-        self.fingerprint = self.poly_field(0)
+        self.fingerprint = 0
         return (self.fingerprint)
 
+    def fingerprint_block(self, data, history=b''):
+        """Window fingerprint at every position of data, computed with uint64 array ops.
+
+        The fingerprint of a window is the XOR of each byte's contribution at
+        its distance from the window end, so it is a table lookup per window
+        position rather than a GF(2^k) multiply per byte. history holds the
+        bytes preceding data; missing history acts as a zero-filled window.
+        The cost is one array pass per window byte, so the sqrt window mode
+        (90 bytes at 8 KiB chunks) is several times slower than log (13).
+        """
+        block = np.frombuffer(data, dtype=np.uint8)
+        hist = np.frombuffer(history, dtype=np.uint8)
+        hist = hist[max(0, len(hist) - self.window_size + 1):]
+        values = np.concatenate((hist, block)).astype(np.intp)
+        n = len(values)
+        fingerprints = self.window_tables[0].take(values)
+        # one gather and XOR per window position, into a reused buffer; the
+        # indices are bytes, so take can skip its bounds check ('wrap')
+        gathered = np.empty_like(fingerprints)
+        for j in range(1, min(self.window_size, n)):
+            part = gathered[:n - j]
+            self.window_tables[j].take(values[:n - j], out=part, mode='wrap')
+            np.bitwise_xor(fingerprints[j:], part, out=fingerprints[j:])
+        return fingerprints[len(hist):]
+
 
 
 class RabinChunker:
-    def __init__(self, min_size=2048, avg_size=8192, max_size=16384, window_mode='sqrt'):
+    # the window keeps rolling across cuts, so a cut also depends on bytes of the previous chunk
+    resets_hash = False
+
+    def __init__(self, min_size=2048, avg_size=8192, max_size=16384, window_mode='sqrt', degree=53, engine='numpy', block_size=1 << 15,
+                 poly=None, seed=DEFAULT_SEED, metrics=None):
         '''
         input in bytes
         modes log,sqrt
+        engines: numpy (vectorized), python (byte loop)
+        poly/seed fix the polynomial so fingerprints are reproducible
+        metrics: optional chunkmetrics.ChunkMetrics that collects per-run counters
 
         '''
+        if engine not in ('numpy', 'python'):
+            raise ValueError(f"Unknown engine: {engine}")
+
+        self.window_mode = window_mode
         if window_mode == 'log':
             self.window_size = (avg_size-1).bit_length()
-        else : 
-            self.window_size = int(np.sqrt(avg_size))        
+        else :
+            self.window_size = int(np.sqrt(avg_size))
 
-        self.rabin = RabinFingerprint(window_size=self.window_size*8)
+        self.rabin = RabinFingerprint(window_size=self.window_size, degree=degree, poly=poly, seed=seed)
         self.min_size = min_size
         self.avg_size = avg_size
         self.max_size = max_size
         self.mask = (1 << ((avg_size-1).bit_length())) - 1
+        self.engine = engine
+        self.block_size = block_size
+        self.metrics = metrics
 
-    def chunk_data(self, data: str):
-        data = data.encode('utf-8')
-        chunks = []
+    def find_candidates(self, data, history=b''):
+        """Positions where the window fingerprint matches the mask, block by block."""
+        return block_candidates(self, self.rabin.fingerprint_block, data, history)
+
+    def next_cut(self, data, candidates, start):
+        """End offset of the chunk starting at start, or None if data runs out first."""
+        first = start + self.min_size
+        last = start + max(self.min_size, self.max_size)
+
+        k = np.searchsorted(candidates, first)
+        if k < len(candidates) and candidates[k] <= last:
+            return int(candidates[k]) + 1
+        if last < len(data):
+            return last + 1
+        return None
+
+    def find_boundaries(self, data):
+        """Chunk end offsets for data."""
+        return walk_boundaries(self, data)
+
+    def describe(self):
+        """(algorithm, params) for chunk manifests: everything the boundaries depend on."""
+        return 'rabin', {'min_size': self.min_size, 'avg_size': self.avg_size, 'max_size': self.max_size,
+                         'window_mode': self.window_mode, 'window_size': self.window_size,
+                         'degree': self.rabin.degree, 'poly': f"{self.rabin.poly_int:x}"}
+
+    def profile(self, lengths, size):
+        """Bytes per region, cut reasons and hash updates of a run cut into chunks of lengths (see chunkmetrics)."""
+        regions, reasons = size_limit_profile(self, lengths)
+        hashed = size
+        if self.engine == 'numpy' and size:
+            # each vectorized block also hashes the window before it
+            blocks = -(-size // self.block_size)
+            hashed += (blocks - 1) * (self.window_size - 1)
+        return regions, reasons, hashed
+
+    def loop_boundaries(self, data):
+        """Chunk end offsets for data, one fingerprint roll per byte."""
+        boundaries = []
         start = 0
         self.rabin.reset_fingerprint()
 
+        # The window keeps rolling across cuts so boundaries only depend on
+        # the last window_size bytes
         for i in range(len(data)):
             byte = data[i]
-            self.rabin.fingerprint_expand(byte)
+            old_byte = data[i - self.window_size] if i >= self.window_size else 0
+            self.rabin.fingerprint_roll(old_byte, byte)
 
             if (i - start >= self.min_size) and ((self.rabin.fingerprint & self.mask) == 0 or (i - start) >= self.max_size):
-                chunks.append(data[start:i+1])
+                boundaries.append(i + 1)
                 start = i + 1
-                self.rabin.reset_fingerprint()
 
         if start < len(data):
-            chunks.append(data[start:])
+            boundaries.append(len(data))
+
+        return boundaries
 
-        return chunks   
+    def chunk_file(self, path):
+        """Chunk end offsets of the file at path, scanned through mmap."""
+        return chunk_file(self, path)
+
+    def rechunk(self, data, boundaries, edits):
+        """find_boundaries of edited data, re-chunking only around the edits (see incrementalchunking.rechunk)."""
+        return rechunk(self, data, boundaries, edits)
+
+    def chunk_stream(self, readable, buffer_size=1 << 20):
+        """Yield chunks from a file object or byte iterator, buffer by buffer."""
+        chunks = stream_chunks(self, readable, buffer_size)
+        return chunks if self.metrics is None else self.metrics.wrap_stream(self, chunks)
+
+    def chunk_data(self, data, output='bytes'):
+        '''
+        data: str (UTF-8 encoded) or any bytes-like object, used without copying
+        output: bytes, views (memoryview slices), offsets ((offset, length) array)
+        or chunkset (ChunkSet of offsets, lengths and digests)
+        '''
+        data = as_buffer(data)
+        return split_chunks(data, self.find_boundaries(data), output)
 
     def analyze_chunks(self, chunks):
-        """Calculate statistics for chunked data."""
-        sizes = [len(chunk) for chunk in chunks]
-        
-        unique_chunks = set(chunks)
-        unique_size = sum(len(chunk) for chunk in unique_chunks)
-        total_size = sum(sizes)
-        
-        dedup_rate = total_size / unique_size if unique_size > 0 else 1.0
-
-        stats = {
-            'num_chunks': len(chunks),
-            'unique_chunks': len(unique_chunks),
-            'total_size': total_size,
-            'unique_size': unique_size,          
-            'dedup_rate': dedup_rate,           
-            'min_chunk': min(sizes) if sizes else 0,
-            'max_chunk': max(sizes) if sizes else 0,
-            'avg_chunk': np.mean(sizes) if sizes else 0,
-            'median_chunk': np.median(sizes) if sizes else 0,
-            'std_dev': np.std(sizes) if sizes else 0,
-            'target_avg': self.avg_size,
-            'window_size': self.window_size,
-        }
-        
-        return stats, sizes
+        """Calculate statistics for chunked data in a single pass.
+
+        Returns the stats dict and the (counts, bin_edges) size histogram.
+        """
+        stats = ChunkStats(self.min_size, self.avg_size, self.max_size).update_many(chunks)
+        return stats.result(window_size=self.window_size), stats.histogram()
 